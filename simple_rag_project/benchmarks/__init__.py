@@ -0,0 +1,8 @@
+"""
+效能基準測試套件
+
+使用合成 PDF 語料、MockLLMService 與 In-Memory Qdrant 量測各階段的延遲、吞吐量與記憶體用量。
+執行方式（於 simple_rag_project 目錄下）：
+
+    python -m benchmarks.run --output bench.json
+"""
@@ -0,0 +1,141 @@
+"""合成 PDF 語料產生器"""
+import random
+import textwrap
+from typing import List, Tuple
+
+# 合成文字使用的詞彙（PDF 內建 Helvetica 字型只支援拉丁字元）
+TOPICS = [
+    "battery", "sensor", "gateway", "firmware", "antenna", "controller",
+    "inverter", "thermostat", "camera", "router", "relay", "actuator",
+]
+NOUNS = [
+    "voltage", "latency", "throughput", "calibration", "encryption", "bandwidth",
+    "temperature", "checksum", "interrupt", "payload", "register", "protocol",
+]
+ADJECTIVES = [
+    "redundant", "adaptive", "low-power", "isolated", "synchronous", "buffered",
+    "shielded", "modular", "deterministic", "fault-tolerant",
+]
+
+# 中文詞彙（僅用於純文字工作負載，例如分塊器比較）
+CJK_TOPICS = ["電池", "感測器", "閘道器", "韌體", "天線", "控制器", "變頻器", "攝影機"]
+CJK_NOUNS = ["電壓", "延遲", "吞吐量", "校正", "加密", "頻寬", "溫度", "通訊協定"]
+CJK_ENDINGS = ["。", "！", "？", "；"]
+
+
+def _sentence(rng: random.Random, topic: str) -> str:
+    """產生一個與主題相關的句子"""
+    return (
+        f"The {topic} module manages {rng.choice(NOUNS)} using a "
+        f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} stage, "
+        f"and section {rng.randint(1, 99)} describes its {rng.choice(NOUNS)} limits."
+    )
+
+
+def generate_pages(rng: random.Random, n_pages: int, sentences_per_page: int) -> List[str]:
+    """產生多頁合成文字"""
+    pages = []
+    for _ in range(n_pages):
+        topic = rng.choice(TOPICS)
+        pages.append(" ".join(_sentence(rng, topic) for _ in range(sentences_per_page)))
+    return pages
+
+
+def generate_cjk_pages(rng: random.Random, n_pages: int, sentences_per_page: int) -> List[str]:
+    """產生多頁中文合成文字"""
+    pages = []
+    for _ in range(n_pages):
+        topic = rng.choice(CJK_TOPICS)
+        pages.append("".join(
+            f"{topic}模組透過{rng.choice(CJK_NOUNS)}管理{rng.choice(CJK_NOUNS)}，"
+            f"第{rng.randint(1, 99)}節說明其{rng.choice(CJK_NOUNS)}限制{rng.choice(CJK_ENDINGS)}"
+            for _ in range(sentences_per_page)
+        ))
+    return pages
+
+
+def _escape(text: str) -> str:
+    """跳脫 PDF 字串中的特殊字元"""
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[str], line_width: int = 90) -> bytes:
+    """
+    將多頁文字組成最小可用的 PDF（不依賴第三方套件）
+
+    Args:
+        pages: 每頁的文字內容
+        line_width: 每行最多字元數
+
+    Returns:
+        PDF 檔案內容
+    """
+    n_pages = len(pages)
+    font_id = 3
+    # 物件編號：1 Catalog、2 Pages、3 Font，之後每頁依序為 Page 與 Content
+    page_ids = [4 + 2 * i for i in range(n_pages)]
+
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: (
+            f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] "
+            f"/Count {n_pages} >>"
+        ).encode("latin-1"),
+        font_id: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+
+    for pid, text in zip(page_ids, pages):
+        lines = textwrap.wrap(text, width=line_width) or [""]
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 790 Td"]
+        ops.extend(f"({_escape(line)}) Tj T*" for line in lines)
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", errors="replace")
+
+        objects[pid] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {pid + 1} 0 R >>"
+        ).encode("latin-1")
+        objects[pid + 1] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+
+    # 組合檔案並記錄 xref 位移
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (obj_id, objects[obj_id])
+
+    xref_offset = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for obj_id in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_offset)
+    return bytes(out)
+
+
+def generate_corpus(
+    n_docs: int,
+    pages_per_doc: int,
+    sentences_per_page: int = 12,
+    seed: int = 42
+) -> List[Tuple[str, bytes]]:
+    """
+    產生合成 PDF 語料
+
+    Returns:
+        [(檔名, PDF 內容), ...]
+    """
+    rng = random.Random(seed)
+    return [
+        (f"synthetic_{i:04d}.pdf", build_pdf(generate_pages(rng, pages_per_doc, sentences_per_page)))
+        for i in range(n_docs)
+    ]
+
+
+def generate_questions(n: int, seed: int = 42) -> List[str]:
+    """產生與語料主題相關的查詢問題"""
+    rng = random.Random(seed + 1)
+    return [
+        f"How does the {rng.choice(TOPICS)} module handle {rng.choice(NOUNS)}?"
+        for _ in range(n)
+    ]
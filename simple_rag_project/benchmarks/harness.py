@@ -0,0 +1,180 @@
+"""基準量測工具 - 延遲統計、吞吐量與記憶體用量"""
+import asyncio
+import math
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近排名法計算百分位數（輸入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], wall_time: float, items: int = None) -> Dict[str, Any]:
+    """
+    彙整延遲樣本
+
+    Args:
+        latencies: 每次操作的延遲（秒）
+        wall_time: 整個工作負載的牆鐘時間（秒）
+        items: 處理的項目總數（預設等於操作次數）
+
+    Returns:
+        延遲統計（毫秒）與吞吐量
+    """
+    values = sorted(latencies)
+    count = len(values)
+    items = count if items is None else items
+    return {
+        "count": count,
+        "items": items,
+        "wall_time_s": round(wall_time, 4),
+        "throughput_per_s": round(items / wall_time, 3) if wall_time > 0 else 0.0,
+        "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+def _current_rss_bytes() -> Optional[int]:
+    """讀取目前 RSS（僅 Linux 支援 /proc）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _max_rss_bytes() -> int:
+    """行程啟動以來的最高 RSS"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 回傳 bytes，Linux 回傳 KB
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class RSSSampler:
+    """背景執行緒定期取樣 RSS，記錄工作負載期間的峰值"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = _current_rss_bytes()
+            if rss is not None:
+                self.peak = max(self.peak, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _current_rss_bytes() or 0
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        rss = _current_rss_bytes()
+        if rss is not None:
+            self.peak = max(self.peak, rss)
+        if self.peak == 0:
+            # 無 /proc 時退回行程層級的最高 RSS
+            self.peak = _max_rss_bytes()
+
+
+def _with_memory(stats: Dict[str, Any], sampler: RSSSampler) -> Dict[str, Any]:
+    stats["peak_rss_mb"] = round(sampler.peak / 1024 / 1024, 2)
+    stats["process_max_rss_mb"] = round(_max_rss_bytes() / 1024 / 1024, 2)
+    return stats
+
+
+def bench_sync(
+    fn: Callable[[Any], Any],
+    inputs: List[Any],
+    warmup: int = 1,
+    items_of: Callable[[Any, Any], int] = None
+) -> Dict[str, Any]:
+    """
+    量測同步函式
+
+    Args:
+        fn: 待測函式，每次以一個輸入呼叫
+        inputs: 輸入列表
+        warmup: 暖身次數（不計入統計）
+        items_of: 由 (輸入, 輸出) 計算處理項目數，用於吞吐量
+
+    Returns:
+        統計結果
+    """
+    for arg in inputs[:warmup]:
+        fn(arg)
+
+    latencies = []
+    items = 0
+    with RSSSampler() as sampler:
+        start = time.perf_counter()
+        for arg in inputs:
+            t0 = time.perf_counter()
+            result = fn(arg)
+            latencies.append(time.perf_counter() - t0)
+            items += items_of(arg, result) if items_of else 1
+        wall = time.perf_counter() - start
+
+    return _with_memory(summarize(latencies, wall, items), sampler)
+
+
+async def bench_async(
+    fn: Callable[[Any], Awaitable[Any]],
+    inputs: List[Any],
+    concurrency: int = 1,
+    warmup: int = 1
+) -> Dict[str, Any]:
+    """
+    以固定並行度量測非同步函式
+
+    Args:
+        fn: 待測協程函式，每次以一個輸入呼叫
+        inputs: 輸入列表
+        concurrency: 同時執行的請求數
+        warmup: 暖身次數（不計入統計）
+
+    Returns:
+        統計結果（含錯誤數）
+    """
+    for arg in inputs[:warmup]:
+        await fn(arg)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def run_one(arg):
+        nonlocal errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                await fn(arg)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    with RSSSampler() as sampler:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_one(arg) for arg in inputs))
+        wall = time.perf_counter() - start
+
+    stats = _with_memory(summarize(latencies, wall), sampler)
+    stats["concurrency"] = concurrency
+    stats["errors"] = errors
+    return stats
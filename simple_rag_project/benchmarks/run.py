@@ -0,0 +1,246 @@
+"""
+效能基準測試執行入口
+
+    python -m benchmarks.run --docs 20 --pages 5 --queries 200 --output bench.json
+    python -m benchmarks.run --output new.json --compare bench.json
+
+所有工作負載皆在暫存目錄中以 SQLite、In-Memory Qdrant 與 MockLLMService 執行，
+不會影響正式資料。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import random
+
+from benchmarks.corpus import generate_cjk_pages, generate_corpus, generate_questions
+from benchmarks.harness import bench_async, bench_sync
+
+WORKLOADS = ["extract_text_from_pdf", "chunk_text", "chunker_compare", "embed_batch", "upload", "query", "query_batch", "mmr"]
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simple RAG 效能基準測試")
+    parser.add_argument("--docs", type=int, default=10, help="合成 PDF 數量")
+    parser.add_argument("--pages", type=int, default=5, help="每份 PDF 的頁數")
+    parser.add_argument("--sentences", type=int, default=12, help="每頁句子數")
+    parser.add_argument("--queries", type=int, default=100, help="查詢次數")
+    parser.add_argument("--concurrency", type=int, default=8, help="API 工作負載的並行請求數")
+    parser.add_argument("--batch-size", type=int, default=32, help="embed_batch 與批次查詢每批的數量")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="MockLLM 每個 token 的模擬延遲（秒）")
+    parser.add_argument("--seed", type=int, default=42, help="語料亂數種子")
+    parser.add_argument("--only", nargs="+", choices=WORKLOADS, help="只執行指定的工作負載")
+    parser.add_argument("--output", help="JSON 結果輸出路徑（預設輸出到 stdout）")
+    parser.add_argument("--compare", help="與先前的 JSON 結果比較")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace, workdir: str):
+    """在匯入應用模組前設定隔離的執行環境"""
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    os.environ["QDRANT_HOST"] = ":memory:"
+    os.environ["LLM_TYPE"] = "mock"
+    os.environ["MOCK_LLM_TOKEN_LATENCY"] = str(args.token_latency)
+    os.environ["DEBUG"] = "0"
+    # 基準測試由單一用戶端送出大量請求，預設關閉每用戶端速率限制
+    os.environ.setdefault("CHAT_RATE_LIMIT", "0")
+    os.environ.setdefault("UPLOAD_RATE_LIMIT", "0")
+    os.environ.setdefault("BATCH_RATE_LIMIT", "0")
+    # 預設量測未命中快取的路徑；設定 CACHE_BACKEND=memory 可量測快取效果
+    os.environ.setdefault("CACHE_BACKEND", "none")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+async def run_benchmarks(args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    """依序執行所有工作負載"""
+    # 延遲匯入：必須在 configure_environment 之後
+    import httpx
+    from main import app
+    from services.rag_service import RAGService, rag_service
+    from utils.chunker import count_tokens
+    from utils.database import init_db
+    from utils.vector_store import vector_store
+
+    selected = args.only or WORKLOADS
+    results: Dict[str, Any] = {}
+
+    corpus = generate_corpus(args.docs, args.pages, args.sentences, seed=args.seed)
+    questions = generate_questions(args.queries, seed=args.seed)
+
+    # 將語料寫入暫存目錄供 PDF 解析使用
+    pdf_dir = os.path.join(workdir, "corpus")
+    os.makedirs(pdf_dir, exist_ok=True)
+    pdf_paths = []
+    for filename, content in corpus:
+        path = os.path.join(pdf_dir, filename)
+        with open(path, "wb") as f:
+            f.write(content)
+        pdf_paths.append(path)
+
+    doc_pages = [RAGService.extract_text_from_pdf(path) for path in pdf_paths]
+    pages = [page for doc in doc_pages for page in doc]
+    chunks = [chunk["text"] for doc in doc_pages for chunk in rag_service.chunker.split_pages(doc)]
+
+    if "extract_text_from_pdf" in selected:
+        results["extract_text_from_pdf"] = bench_sync(
+            RAGService.extract_text_from_pdf, pdf_paths,
+            items_of=lambda _, out: len(out)
+        )
+
+    if "chunk_text" in selected:
+        # 量測匯入流程實際使用的分塊器（每份文件跨頁分塊）；langchain 分塊器只在 chunker_compare 中比較
+        results["chunk_text"] = bench_sync(
+            rag_service.chunker.split_pages, doc_pages,
+            items_of=lambda _, out: len(out)
+        )
+
+    if "chunker_compare" in selected:
+        rng = random.Random(args.seed)
+        cjk_docs = [generate_cjk_pages(rng, args.pages, args.sentences) for _ in range(args.docs)]
+        splitters = {
+            # 舊流程：langchain 分塊器逐頁分割（以字元計長）
+            "langchain": lambda doc: [c for page in doc if page for c in RAGService.chunk_text(page)],
+            # 新流程：TextChunker 跨頁連續分割（以 token 計長）
+            "text_chunker": lambda doc: [c["text"] for c in rag_service.chunker.split_pages(doc)],
+        }
+        results["chunker_compare"] = {}
+        for corpus_name, docs in (("latin", doc_pages), ("cjk", cjk_docs)):
+            results["chunker_compare"][corpus_name] = {}
+            for name, split in splitters.items():
+                stats = bench_sync(split, docs, items_of=lambda _, out: len(out))
+                texts = [text for doc in docs for text in split(doc)]
+                stats["chunk_count"] = len(texts)
+                stats["mean_chunk_tokens"] = round(sum(map(count_tokens, texts)) / len(texts), 1) if texts else 0.0
+                stats["max_chunk_tokens"] = max(map(count_tokens, texts), default=0)
+                results["chunker_compare"][corpus_name][name] = stats
+
+    if "embed_batch" in selected:
+        batches = [chunks[i:i + args.batch_size] for i in range(0, len(chunks), args.batch_size)]
+        results["embed_batch"] = bench_sync(
+            vector_store.embed_batch, batches,
+            items_of=lambda batch, _: len(batch)
+        )
+        results["embed_batch"]["batch_size"] = args.batch_size
+
+    await init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def upload(doc):
+            filename, content = doc
+            response = await client.post(
+                "/knowledge/upload",
+                files={"file": (filename, content, "application/pdf")},
+                data={"category": "benchmark"}
+            )
+            response.raise_for_status()
+
+        async def query(question):
+            response = await client.post("/chat/query", json={"question": question})
+            response.raise_for_status()
+
+        async def query_batch(batch):
+            response = await client.post("/chat/query/batch", json={"questions": batch})
+            response.raise_for_status()
+
+        # 查詢需要已建立索引的語料，即使未量測上傳也要先匯入
+        if "upload" in selected:
+            results["upload"] = await bench_async(upload, corpus, concurrency=args.concurrency, warmup=0)
+        elif "query" in selected or "query_batch" in selected or "mmr" in selected:
+            for doc in corpus:
+                await upload(doc)
+
+        if "query" in selected:
+            results["query"] = await bench_async(query, questions, concurrency=args.concurrency)
+
+        if "query_batch" in selected:
+            batches = [questions[i:i + args.batch_size] for i in range(0, len(questions), args.batch_size)]
+            stats = await bench_async(query_batch, batches, concurrency=1, warmup=0)
+            # 吞吐量以問題數計算，方便與逐筆查詢比較
+            stats["items"] = len(questions)
+            stats["throughput_per_s"] = round(len(questions) / stats["wall_time_s"], 3) if stats["wall_time_s"] else 0.0
+            stats["batch_size"] = args.batch_size
+            results["query_batch"] = stats
+
+        if "mmr" in selected:
+            # 比較純相關性排序與 MMR 多樣化的檢索延遲（MMR 需多取候選並帶回向量）
+            results["mmr"] = {}
+            for name, enabled in (("relevance", False), ("mmr", True)):
+                results["mmr"][name] = bench_sync(
+                    lambda q, enabled=enabled: rag_service.search(q, top_k=5, mmr=enabled),
+                    questions,
+                    items_of=lambda _, out: len(out)
+                )
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "corpus": {"docs": len(corpus), "pages": len(pages), "chunks": len(chunks)},
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """比較兩次結果的 p50/p95/吞吐量變化"""
+    lines = []
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        parts = []
+        for key in ("p50_ms", "p95_ms", "throughput_per_s"):
+            old, new = base.get(key), stats.get(key)
+            if old:
+                parts.append(f"{key} {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+        lines.append(f"{name}: " + ", ".join(parts))
+    return lines
+
+
+def main(argv: List[str] = None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="rag_bench_") as workdir:
+        configure_environment(args, workdir)
+        start = time.perf_counter()
+        report = asyncio.run(run_benchmarks(args, workdir))
+        report["meta"]["total_time_s"] = round(time.perf_counter() - start, 3)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"結果已寫入 {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
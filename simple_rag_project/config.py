@@ -13,17 +13,72 @@ class Settings(BaseSettings):
     # Qdrant
     qdrant_host: str = os.getenv("QDRANT_HOST", "localhost")
     qdrant_port: int = int(os.getenv("QDRANT_PORT", 6333))
+    collection_name: str = os.getenv("COLLECTION_NAME", "public")  # 查詢與寫入使用的名稱（重建索引後為別名）
+    index_config_refresh_interval: float = float(os.getenv("INDEX_CONFIG_REFRESH_INTERVAL", 30))  # 檢查別名是否已切換的間隔（秒）
     
+    # Embedding
+    embedding_model: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    embedding_model_allowlist: str = os.getenv("EMBEDDING_MODEL_ALLOWLIST", "")  # 重建索引可改用的其他嵌入模型（逗號分隔）
+
+    # Redis
+    redis_host: str = os.getenv("REDIS_HOST", "localhost")
+    redis_port: int = int(os.getenv("REDIS_PORT", 6379))
+    redis_db: int = int(os.getenv("REDIS_DB", 0))
+
+    # 查詢快取（redis 無法連線時改用程序內快取；none 為停用）
+    cache_backend: str = os.getenv("CACHE_BACKEND", "redis")  # redis / memory / none
+    embedding_cache_ttl: int = int(os.getenv("EMBEDDING_CACHE_TTL", 86400))  # 查詢向量快取秒數
+    retrieval_cache_ttl: int = int(os.getenv("RETRIEVAL_CACHE_TTL", 300))  # 檢索結果快取秒數
+
     # Ollama
     ollama_url: str = os.getenv("OLLAMA_URL", "http://localhost:11434")
     ollama_model: str = os.getenv("OLLAMA_MODEL", "gemma2:9b")
     
     # LLM
     llm_type: str = os.getenv("LLM_TYPE", "mock")
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", 4))  # 同時進行的生成數上限
+    mock_llm_token_latency: float = float(os.getenv("MOCK_LLM_TOKEN_LATENCY", 0))  # 模擬每個 token 的生成延遲（秒）
+    
+    # 文字分塊（以 token 計）
+    chunk_size: int = int(os.getenv("CHUNK_SIZE", 200))
+    chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", 40))
     
+    # 檢索結果多樣化（MMR）
+    mmr_enabled: bool = os.getenv("MMR_ENABLED", "0") == "1"
+    mmr_lambda: float = float(os.getenv("MMR_LAMBDA", 0.5))  # 1 為只看相關性，0 為只看多樣性
+    mmr_fetch_k: int = int(os.getenv("MMR_FETCH_K", 20))  # MMR 挑選前取回的候選數
+    
+    # 批次查詢
+    batch_max_questions: int = int(os.getenv("BATCH_MAX_QUESTIONS", 500))
+    batch_max_concurrency: int = int(os.getenv("BATCH_MAX_CONCURRENCY", 8))  # LLM 生成的最大並行數
+    
+    # 准入控制（每個 worker 各自計算）
+    chat_max_concurrency: int = int(os.getenv("CHAT_MAX_CONCURRENCY", 16))  # /chat/query 同時處理的請求數
+    chat_max_queue: int = int(os.getenv("CHAT_MAX_QUEUE", 32))  # 額滿時可排隊等待的請求數，超過直接回 503
+    upload_max_concurrency: int = int(os.getenv("UPLOAD_MAX_CONCURRENCY", 2))
+    upload_max_queue: int = int(os.getenv("UPLOAD_MAX_QUEUE", 8))
+    admission_queue_timeout: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 5))  # 排隊等待的上限（秒）
+    chat_rate_limit: float = float(os.getenv("CHAT_RATE_LIMIT", 60))  # 每個用戶端每分鐘的請求數，0 為不限制
+    chat_rate_burst: int = int(os.getenv("CHAT_RATE_BURST", 10))
+    batch_max_inflight: int = int(os.getenv("BATCH_MAX_INFLIGHT", 2))  # /chat/query/batch 同時處理的請求數
+    batch_max_queue: int = int(os.getenv("BATCH_MAX_QUEUE", 4))
+    batch_rate_limit: float = float(os.getenv("BATCH_RATE_LIMIT", 600))  # 每個用戶端每分鐘的問題數
+    batch_rate_burst: int = int(os.getenv("BATCH_RATE_BURST", 500))
+    upload_rate_limit: float = float(os.getenv("UPLOAD_RATE_LIMIT", 10))
+    upload_rate_burst: int = int(os.getenv("UPLOAD_RATE_BURST", 5))
+
+    # 請求效能剖析（請求帶 X-Profile: 1 時剖析該請求）
+    profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "0") == "1"  # 預設關閉，可由管理 API 切換
+    profiling_admin_token: str = os.getenv("PROFILING_ADMIN_TOKEN", "")  # 剖析與重建索引管理 API 需帶 X-Admin-Token，未設定時停用
+    profile_dir: str = os.getenv("PROFILE_DIR", "./.tmp/profiles")
+    profile_max_files: int = int(os.getenv("PROFILE_MAX_FILES", 50))  # 超過時刪除最舊的剖析檔
+
     # App
     debug: bool = os.getenv("DEBUG", "1") == "1"
     upload_dir: str = os.getenv("UPLOAD_DIR", "./.tmp/uploads")
+    text_store_dir: str = os.getenv("TEXT_STORE_DIR", "./.tmp/texts")
+    disconnect_poll_interval: float = float(os.getenv("DISCONNECT_POLL_INTERVAL", 0.5))  # 檢查用戶端斷線的間隔（秒）
+    reindex_state_path: str = os.getenv("REINDEX_STATE_PATH", "./.tmp/reindex_state.json")
 
 
 settings = Settings()
\ No newline at end of file
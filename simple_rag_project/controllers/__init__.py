@@ -1,4 +1,6 @@
 from controllers.knowledge import router as knowledge_router
 from controllers.chat import router as chat_router
+from controllers.metrics import router as metrics_router
+from controllers.profiling import router as profiling_router
 
-__all__ = ["knowledge_router", "chat_router"]
+__all__ = ["knowledge_router", "chat_router", "metrics_router", "profiling_router"]
@@ -1,9 +1,13 @@
 """對話 API - RAG 查詢"""
-from typing import List
-from fastapi import APIRouter
-from pydantic import BaseModel
+from typing import List, Optional
+from fastapi import APIRouter, Request, Response
+from pydantic import BaseModel, Field
 
+from config import settings
+from utils.admission import chat_admission, batch_admission
 from utils.database import get_session
+from utils.disconnect import run_until_disconnected, ClientDisconnected
+from utils.metrics import metrics
 from services.chat_service import chat_service
 
 router = APIRouter(prefix="/chat", tags=["對話"])
@@ -12,6 +16,8 @@ router = APIRouter(prefix="/chat", tags=["對話"])
 class QueryRequest(BaseModel):
     question: str
     category: str = None
+    mmr: Optional[bool] = None  # 是否以 MMR 多樣化檢索結果（預設依設定）
+    mmr_lambda: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class QueryResponse(BaseModel):
@@ -20,14 +26,72 @@ class QueryResponse(BaseModel):
     sources: List[dict]
 
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=settings.batch_max_questions)
+    category: str = None
+    top_k: int = Field(default=5, ge=1, le=50)
+    generate: bool = True  # False 時只回傳檢索來源，不呼叫 LLM
+    max_concurrency: int = Field(default=4, ge=1, le=settings.batch_max_concurrency)
+    mmr: Optional[bool] = None
+    mmr_lambda: Optional[float] = Field(default=None, ge=0, le=1)
+
+
+class BatchQueryItem(BaseModel):
+    question: str
+    answer: Optional[str] = None
+    sources: List[dict]
+    error: Optional[str] = None
+
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryItem]
+
+
+# 用戶端在回應前斷線（沿用 nginx 的 499 狀態碼）
+CLIENT_CLOSED_REQUEST = 499
+
+
 @router.post("/query", response_model=QueryResponse)
-async def query(request: QueryRequest):
+async def query(request: QueryRequest, http_request: Request):
     """RAG 查詢"""
-    async with get_session() as session:
-        result = await chat_service.simple_query(
-            session=session,
-            
-            question=request.question,
-            category=request.category
-        )
-        return result
+    async def run():
+        # 在可取消的工作內排隊，用戶端於等待期間斷線時也會釋放佇列位置
+        async with chat_admission.admit(http_request), get_session() as session:
+            return await chat_service.simple_query(
+                session=session,
+                question=request.question,
+                category=request.category,
+                mmr=request.mmr,
+                mmr_lambda=request.mmr_lambda
+            )
+    
+    try:
+        return await run_until_disconnected(http_request, run())
+    except ClientDisconnected:
+        metrics.incr("chat_cancelled_total")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch(request: BatchQueryRequest, http_request: Request):
+    """批次 RAG 查詢（結果順序與問題相同）"""
+    async def run():
+        # 每個問題都會向量化與檢索，速率限制依問題數扣除
+        async with batch_admission.admit(http_request, cost=len(request.questions)), get_session() as session:
+            results = await chat_service.batch_query(
+                session=session,
+                questions=request.questions,
+                category=request.category,
+                top_k=request.top_k,
+                generate=request.generate,
+                max_concurrency=request.max_concurrency,
+                mmr=request.mmr,
+                mmr_lambda=request.mmr_lambda
+            )
+            return BatchQueryResponse(results=results)
+    
+    try:
+        return await run_until_disconnected(http_request, run())
+    except ClientDisconnected:
+        metrics.incr("chat_cancelled_total")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
@@ -1,9 +1,13 @@
-"""知識庫 API - 文件上傳"""
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from pydantic import BaseModel
+"""知識庫 API - 文件上傳與重建索引"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
+from pydantic import BaseModel, Field
 
+from controllers.profiling import require_admin
+from utils.admission import upload_admission
 from utils.database import get_session
 from services.rag_service import rag_service
+from services.reindex_service import reindex_service, ReindexError
 
 router = APIRouter(prefix="/knowledge", tags=["知識庫"])
 
@@ -14,8 +18,16 @@ class UploadResponse(BaseModel):
     filename: str
 
 
+class ReindexRequest(BaseModel):
+    embedding_model: Optional[str] = None  # 預設沿用目前的嵌入模型，其他模型需列於 EMBEDDING_MODEL_ALLOWLIST
+    chunk_size: Optional[int] = Field(default=None, ge=50, le=2000)
+    chunk_overlap: Optional[int] = Field(default=None, ge=0, le=1000)
+    drop_old: bool = False  # 切換完成後是否刪除舊 Collection
+
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_document(
+    request: Request,
     file: UploadFile = File(...),
     category: str = Form(default="default")
 ):
@@ -23,18 +35,45 @@ async def upload_document(
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="只支援 PDF 檔案")
     
-    content = await file.read()
-    
-    async with get_session() as session:
-        success, message = await rag_service.process_file(
-            session=session,
-            file_content=content,
-            filename=file.filename,
-            category=category,
-            user_id=None
-        )
+    # FastAPI 在進入端點前已接收整個 multipart 內容，滿載時的 503 省下的是解析與向量化，而非傳輸
+    async with upload_admission.admit(request):
+        content = await file.read()
+        
+        async with get_session() as session:
+            success, message = await rag_service.process_file(
+                session=session,
+                file_content=content,
+                filename=file.filename,
+                category=category,
+                user_id=None
+            )
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
     
     return UploadResponse(success=True, message=message, filename=file.filename)
+
+
+@router.post("/reindex", dependencies=[Depends(require_admin)])
+async def start_reindex(request: ReindexRequest):
+    """在背景重建索引至新 Collection，完成後切換別名"""
+    try:
+        return await reindex_service.start(
+            embedding_model=request.embedding_model,
+            chunk_size=request.chunk_size,
+            chunk_overlap=request.chunk_overlap,
+            drop_old=request.drop_old
+        )
+    except ReindexError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/reindex", dependencies=[Depends(require_admin)])
+async def get_reindex_status():
+    """查詢重建索引進度"""
+    status = reindex_service.get_status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="尚未執行過重建索引")
+    return status
@@ -0,0 +1,12 @@
+"""監控 API - 程序內指標"""
+from fastapi import APIRouter
+
+from utils.metrics import metrics
+
+router = APIRouter(prefix="/metrics", tags=["監控"])
+
+
+@router.get("")
+async def get_metrics():
+    """取得目前 worker 的指標"""
+    return metrics.snapshot()
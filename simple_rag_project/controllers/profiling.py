@@ -0,0 +1,67 @@
+"""效能剖析 API - 開關剖析模式與下載剖析檔"""
+import hmac
+import io
+import os
+import pstats
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+from pydantic import BaseModel
+
+from config import settings
+from utils.profiling import profiler
+
+router = APIRouter(prefix="/profiling", tags=["效能剖析"])
+
+
+def require_admin(x_admin_token: str = Header(default="")):
+    """檢查 X-Admin-Token；未設定 PROFILING_ADMIN_TOKEN 時管理 API（剖析、重建索引）一律拒絕"""
+    token = settings.profiling_admin_token
+    if not token:
+        raise HTTPException(status_code=403, detail="未設定 PROFILING_ADMIN_TOKEN，管理 API 已停用")
+    if not hmac.compare_digest(x_admin_token.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="需要管理權杖")
+
+
+class ProfilingToggle(BaseModel):
+    enabled: bool
+
+
+@router.get("", dependencies=[Depends(require_admin)])
+async def get_profiling_status():
+    """剖析模式狀態"""
+    return {"enabled": profiler.enabled, "header": "X-Profile: 1"}
+
+
+@router.put("", dependencies=[Depends(require_admin)])
+async def set_profiling(request: ProfilingToggle):
+    """開關剖析模式（只影響目前的 worker）"""
+    profiler.enabled = request.enabled
+    return {"enabled": profiler.enabled}
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """列出已保存的剖析檔"""
+    return profiler.list_profiles()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str, format: str = "prof", limit: int = 40):
+    """
+    下載剖析檔
+
+    format=prof 回傳 pstats 格式（可用 snakeviz 或 python -m pstats 開啟），
+    format=text 回傳依累計時間排序的前 limit 個函式。
+    """
+    path = profiler.file_path(profile_id)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="找不到剖析檔")
+
+    if format == "text":
+        output = io.StringIO()
+        pstats.Stats(path, stream=output).sort_stats("cumulative").print_stats(limit)
+        return PlainTextResponse(output.getvalue())
+    if format != "prof":
+        raise HTTPException(status_code=400, detail="format 只支援 prof 或 text")
+
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
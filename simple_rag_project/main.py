@@ -10,7 +10,10 @@ from fastapi.middleware.cors import CORSMiddleware  # CORS 中間件
 
 from config import settings  # 應用設定
 from utils.database import init_db  # 資料庫初始化
-from controllers import knowledge_router, chat_router  # API 路由
+from utils.cache import query_cache  # 查詢快取
+from services.reindex_service import reindex_service  # 重建索引
+from utils.profiling import ProfilingMiddleware  # 請求效能剖析
+from controllers import knowledge_router, chat_router, metrics_router, profiling_router  # API 路由
 
 
 class CustomJSONEncoder(json.JSONEncoder):
@@ -27,6 +30,10 @@ async def lifespan(app: FastAPI):
     print("正在初始化資料庫...")
     await init_db()
     print("資料庫初始化完成！")
+    # 連線查詢快取（Redis 無法連線時改用程序內快取）
+    await query_cache.connect()
+    # 繼續中斷的重建索引工作
+    await reindex_service.resume_if_needed()
     yield
     # 關閉時清理資源
     print("應用程式關閉")
@@ -50,9 +57,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 效能剖析（PROFILING_ENABLED 或 PUT /profiling 開啟後，帶 X-Profile: 1 的請求才會剖析）
+app.add_middleware(ProfilingMiddleware)
+
 # 註冊路由
 app.include_router(knowledge_router)
 app.include_router(chat_router)
+app.include_router(metrics_router)
+app.include_router(profiling_router)
 
 
 if __name__ == "__main__":
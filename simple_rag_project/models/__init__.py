@@ -1,4 +1,4 @@
 from models.base import Base
-from models.models import User, Document, ChatHistory
+from models.models import Document, ChatHistory
 
-__all__ = ["Base", "User", "Document", "ChatHistory"]
+__all__ = ["Base", "Document", "ChatHistory"]
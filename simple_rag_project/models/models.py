@@ -13,6 +13,8 @@ class Document(Base):
     category = Column(String(100), index=True, default="default")
     status = Column(String(20), default="pending")  # pending, processing, completed, failed
     chunk_count = Column(Integer, default=0)
+    file_path = Column(String(500), nullable=True)  # 上傳檔案的儲存路徑（重建索引用）
+    text_path = Column(String(500), nullable=True)  # 逐頁擷取文字的壓縮儲存路徑
     created_at = Column(DateTime, default=datetime.utcnow)
     
     __table_args__ = (
@@ -1,4 +1,5 @@
 from services.rag_service import RAGService
 from services.chat_service import ChatService
+from services.reindex_service import ReindexService
 
-__all__ = ["RAGService", "ChatService"]
+__all__ = ["RAGService", "ChatService", "ReindexService"]
@@ -1,5 +1,6 @@
 """對話服務"""
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List
 from uuid import uuid4
 
 from sqlalchemy import select, update
@@ -17,7 +18,9 @@ class ChatService:
         self,
         session: AsyncSession,
         question: str,
-        category: str = None
+        category: str = None,
+        mmr: bool = None,
+        mmr_lambda: float = None
     ) -> Dict[str, Any]:
         """
         簡單 RAG 問答
@@ -26,19 +29,14 @@ class ChatService:
         context = "（沒有找到相關資料）"
         
         try:
-            results = rag_service.search(
+            results = await rag_service.asearch(
                 query=question,
                 category=category,
-                top_k=5
+                top_k=5,
+                mmr=mmr,
+                mmr_lambda=mmr_lambda
             ) 
-            
-            if results:
-                context_parts = []
-                for i, r in enumerate(results, 1):
-                    meta = r.get("metadata", {})
-                    source = f"[來源: {meta.get('filename', '未知')}, 頁{meta.get('page', '?')}]"
-                    context_parts.append(f"[資料 {i}] {source}\n{r['text']}")
-                context = "\n\n".join(context_parts)
+            context = self._build_context(results)
         except Exception as e:
             print(f"[ERROR] RAG 搜尋失敗: {e}") 
             context = "（沒有找到相關資料）"
@@ -48,30 +46,131 @@ class ChatService:
         answer = await llm_service.rag_query_async(question, context)
         
         # 儲存對話歷史
-        session_id = str(uuid4())
-        chat = ChatHistory(
-            session_id=session_id,
-            title=question[:50],
-            messages=[
-                {"role": "user", "content": question},
-                {"role": "assistant", "content": answer}
-            ]
-        )
-        session.add(chat)
+        session.add(self._new_history(question, answer))
         await session.commit()
         
         return {
             "question": question,
             "answer": answer,
-            "sources": [
-                {
-                    "filename": r.get("metadata", {}).get("filename"),
-                    "page": r.get("metadata", {}).get("page"),
-                    "score": r.get("score")
-                }
-                for r in results
-            ]
+            "sources": self._format_sources(results)
         }
+    
+    async def batch_query(
+        self,
+        session: AsyncSession,
+        questions: List[str],
+        category: str = None,
+        top_k: int = 5,
+        generate: bool = True,
+        max_concurrency: int = 4,
+        mmr: bool = None,
+        mmr_lambda: float = None
+    ) -> List[Dict[str, Any]]:
+        """
+        批次 RAG 問答
+        
+        所有問題以一次批次向量化與一次 Qdrant 請求完成檢索，
+        再以有限並行度生成回答。單一問題失敗只記錄在該項的 error，不影響其他問題。
+        檢索失敗的問題不生成回答（沒有參考資料的回答不可信），也不寫入對話歷史。
+        
+        Returns:
+            與 questions 順序相同的結果列表
+        """
+        all_results = await rag_service.asearch_batch(
+            queries=questions,
+            category=category,
+            top_k=top_k,
+            mmr=mmr,
+            mmr_lambda=mmr_lambda,
+            return_exceptions=True
+        )
+        
+        items = []
+        for question, results in zip(questions, all_results):
+            if isinstance(results, Exception):
+                items.append({
+                    "question": question,
+                    "answer": None,
+                    "sources": [],
+                    "error": f"檢索失敗: {str(results)}"
+                })
+            else:
+                items.append({
+                    "question": question,
+                    "answer": None,
+                    "sources": self._format_sources(results),
+                    "error": None
+                })
+        
+        if not generate:
+            return items
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def answer_one(item: Dict[str, Any], results: List[Dict[str, Any]]):
+            async with semaphore:
+                try:
+                    item["answer"] = await llm_service.rag_query_async(
+                        item["question"], self._build_context(results)
+                    )
+                except Exception as e:
+                    print(f"[ERROR] 批次問答失敗: {e}")
+                    item["error"] = f"生成回答失敗: {str(e)}"
+        
+        await asyncio.gather(*(
+            answer_one(item, results)
+            for item, results in zip(items, all_results)
+            if item["error"] is None
+        ))
+        
+        # 儲存對話歷史（AsyncSession 不可並行使用，因此在生成完成後統一寫入）
+        for item in items:
+            if item["error"] is None:
+                session.add(self._new_history(item["question"], item["answer"]))
+        await session.commit()
+        
+        return items
+    
+    @staticmethod
+    def _build_context(results: List[Dict[str, Any]]) -> str:
+        """將檢索結果組成 Prompt 參考資料"""
+        if not results:
+            return "（沒有找到相關資料）"
+        
+        context_parts = []
+        for i, r in enumerate(results, 1):
+            meta = r.get("metadata", {})
+            page = meta.get("page", "?")
+            if meta.get("page_end") and meta["page_end"] != page:
+                page = f"{page}-{meta['page_end']}"
+            source = f"[來源: {meta.get('filename', '未知')}, 頁{page}]"
+            context_parts.append(f"[資料 {i}] {source}\n{r['text']}")
+        return "\n\n".join(context_parts)
+    
+    @staticmethod
+    def _format_sources(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """整理回傳給前端的來源資訊"""
+        return [
+            {
+                "filename": r.get("metadata", {}).get("filename"),
+                "page": r.get("metadata", {}).get("page"),
+                "page_end": r.get("metadata", {}).get("page_end"),
+                "score": r.get("score")
+            }
+            for r in results
+        ]
+    
+    @staticmethod
+    def _new_history(question: str, answer: str) -> ChatHistory:
+        """建立對話歷史記錄"""
+        return ChatHistory(
+            session_id=str(uuid4()),
+            title=question[:50],
+            messages=[
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": answer}
+            ]
+        )
   
 
 # 全域實例
@@ -1,10 +1,13 @@
 """RAG 服務 - 文件處理與向量化"""
 import os
 import re
+import asyncio
 import logging
+import time
 import uuid
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 
 import PyPDF2
 import pdfplumber
@@ -14,16 +17,76 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from models import Document
 from utils.vector_store import vector_store
+from utils.chunker import TextChunker
+from utils.text_store import TextStore
+from utils.mmr import mmr_select
+from utils.cache import query_cache
+from utils.profiling import to_thread
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=8)
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """依參數快取 langchain 分塊器，避免每頁重新建立"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", "。", ".", " ", ""]
+    )
+
+
 class RAGService:
     """RAG 服務"""
     
     def __init__(self):
         self.upload_dir = settings.upload_dir
         os.makedirs(self.upload_dir, exist_ok=True)
+        self.chunker = self._chunker_for(vector_store.index_config)
+        self.text_store = TextStore(settings.text_store_dir)
+        self.collection_name = settings.collection_name
+        # 寫入向量資料庫時持有；重建索引在切換別名前取得，確保切換期間沒有漏掉的新文件
+        self.ingest_lock = asyncio.Lock()
+        self._index_checked_at = time.monotonic()
+
+    @staticmethod
+    def _chunker_for(index_config: Dict[str, Any]) -> TextChunker:
+        """依索引記錄的分塊參數建立分塊器（沒有記錄時使用設定值）"""
+        chunk_size = index_config.get("chunk_size", settings.chunk_size)
+        chunk_overlap = index_config.get("chunk_overlap", settings.chunk_overlap)
+        if (chunk_size, chunk_overlap) != (settings.chunk_size, settings.chunk_overlap):
+            logger.warning(
+                f"使用索引記錄的分塊參數 {chunk_size}/{chunk_overlap}，"
+                f"忽略 CHUNK_SIZE/CHUNK_OVERLAP={settings.chunk_size}/{settings.chunk_overlap}"
+            )
+        return TextChunker(chunk_size, chunk_overlap)
+
+    def index_metadata(self) -> Dict[str, Any]:
+        """建立 Collection 時記錄的索引設定"""
+        return {
+            "embedding_model": vector_store.embedding_model,
+            "chunk_size": self.chunker.chunk_size,
+            "chunk_overlap": self.chunker.chunk_overlap,
+        }
+
+    async def sync_index_config(self, force: bool = False):
+        """
+        定期檢查別名是否已指向其他 Collection（其他 worker 完成重建索引），
+        是的話改用新索引記錄的嵌入模型與分塊參數
+        """
+        now = time.monotonic()
+        if not force and now - self._index_checked_at < settings.index_config_refresh_interval:
+            return
+        self._index_checked_at = now
+        try:
+            config = await to_thread(vector_store.refresh_index_config, self.collection_name)
+        except Exception as e:
+            logger.error(f"重新載入索引設定失敗: {e}")
+            return
+        if config:
+            self.chunker = self._chunker_for(config)
+            logger.info(f"索引已切換至 {config['collection']}（{vector_store.embedding_model}）")
 
     @staticmethod
     def extract_text_from_pdf(file_path: str) -> List[str]:
@@ -55,14 +118,67 @@ class RAGService:
 
     @staticmethod
     def chunk_text(text: str, chunk_size: int = 500, chunk_overlap: int = 100) -> List[str]:
-        """將文字分塊"""
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", "。", ".", " ", ""]
-        )
-        return splitter.split_text(text)
+        """將文字分塊（以字元計長的 langchain 分塊器）"""
+        return _get_splitter(chunk_size, chunk_overlap).split_text(text)
 
+    @staticmethod
+    def point_id(doc_id: int, index: int) -> str:
+        """依文件與區塊序號產生固定的 Point ID，重複寫入時會覆蓋而不會重複"""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"document/{doc_id}/chunk/{index}"))
+    
+    def prepare_chunks(
+        self,
+        pages: List[str],
+        doc_id: int,
+        filename: str,
+        category: str,
+        chunker: TextChunker = None
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
+        """
+        將文件各頁分塊並組成寫入向量資料庫所需的資料
+        
+        Returns:
+            (區塊文字列表, metadata 列表, Point ID 列表)
+        """
+        chunks = (chunker or self.chunker).split_pages(pages)
+        texts = [chunk["text"] for chunk in chunks]
+        metadata = [
+            {
+                "doc_id": doc_id,
+                "filename": filename,
+                "page": chunk["page_start"],
+                "page_end": chunk["page_end"],
+                "category": category
+            }
+            for chunk in chunks
+        ]
+        ids = [self.point_id(doc_id, i) for i in range(len(chunks))]
+        return texts, metadata, ids
+    
+    def _save_pages(self, doc_id: int, pages: List[str]) -> Optional[str]:
+        """保存擷取文字，失敗時只記錄警告（之後仍可從 PDF 重新擷取）"""
+        try:
+            return self.text_store.save(doc_id, pages)
+        except Exception as e:
+            logger.warning(f"擷取文字儲存失敗: {e}")
+            return None
+    
+    def load_document_pages(self, doc: Document) -> Tuple[List[str], Optional[str]]:
+        """
+        取得文件的逐頁文字，優先讀取文字儲存，沒有時才解析 PDF 並補存
+        
+        Returns:
+            (每頁文字, 文字儲存路徑)
+        """
+        if doc.text_path and os.path.exists(doc.text_path):
+            return self.text_store.load(doc.text_path), doc.text_path
+        
+        if not doc.file_path or not os.path.exists(doc.file_path):
+            raise FileNotFoundError(f"找不到文件 {doc.id} 的文字儲存或原始檔")
+        
+        pages = self.extract_text_from_pdf(doc.file_path)
+        return pages, self._save_pages(doc.id, pages)
+    
     async def process_file(
         self,
         session: AsyncSession,
@@ -75,6 +191,7 @@ class RAGService:
         file_ext = Path(filename).suffix
         unique_filename = f"{uuid.uuid4()}{file_ext}"
         file_path = os.path.join(self.upload_dir, unique_filename)
+        text_path = None
         
         try:
             # 1. 儲存檔案
@@ -86,7 +203,8 @@ class RAGService:
             doc = Document(
                 filename=filename,
                 category=category,
-                status="processing"
+                status="processing",
+                file_path=file_path
             )
             session.add(doc)
             await session.flush()
@@ -114,53 +232,50 @@ class RAGService:
                 await session.commit()
                 return False, "無法擷取文字內容"
             
-            # 4. 分塊並向量化
-            all_chunks = []
-            all_metadata = []
+            # 保存擷取文字，之後重新分塊或向量化時不必再解析 PDF
+            text_path = self._save_pages(doc.id, pages)
             
-            for page_num, page_text in enumerate(pages, 1):
-                if not page_text:
-                    continue
-                
-                chunks = self.chunk_text(page_text)
-                for chunk in chunks:
-                    all_chunks.append(chunk)
-                    all_metadata.append({
-                        "filename": filename,
-                        "page": page_num,
-                        "category": category
-                    })
+            # 4. 分塊並向量化（跨頁連續分塊，記錄起訖頁碼）
+            await self.sync_index_config()
+            all_chunks, all_metadata, point_ids = self.prepare_chunks(pages, doc.id, filename, category)
             
             logger.debug(f"生成了 {len(all_chunks)} 個文字區塊")
             
             # 5. 存入向量資料庫
-            collection_name = "public"
-            try:
-                count = vector_store.add_documents(collection_name, all_chunks, all_metadata)
-                if count == 0:
-                    raise ValueError("向量化失敗：無法添加任何文件")
-                logger.info(f"成功添加 {count} 個文字區塊到向量資料庫")
-            except Exception as e:
-                logger.error(f"向量化失敗: {e}")
+            async with self.ingest_lock:
+                try:
+                    vector_store.ensure_alias(self.collection_name, metadata=self.index_metadata())
+                    count = vector_store.add_documents(
+                        self.collection_name, all_chunks, all_metadata, ids=point_ids
+                    )
+                    if count == 0:
+                        raise ValueError("向量化失敗：無法添加任何文件")
+                    logger.info(f"成功添加 {count} 個文字區塊到向量資料庫")
+                except Exception as e:
+                    logger.error(f"向量化失敗: {e}")
+                    self.text_store.delete(text_path)
+                    await session.execute(
+                        update(Document).where(Document.id == doc.id).values(status="failed")
+                    )
+                    await session.commit()
+                    return False, f"向量化失敗: {str(e)}"
+                
+                # 6. 更新狀態
                 await session.execute(
-                    update(Document).where(Document.id == doc.id).values(status="failed")
+                    update(Document)
+                    .where(Document.id == doc.id)
+                    .values(status="completed", chunk_count=count, text_path=text_path)
                 )
                 await session.commit()
-                return False, f"向量化失敗: {str(e)}"
-            
-            # 6. 更新狀態
-            await session.execute(
-                update(Document)
-                .where(Document.id == doc.id)
-                .values(status="completed", chunk_count=count)
-            )
-            await session.commit()
+                # 新文件可能改變任何查詢的結果，讓所有 worker 的檢索快取失效
+                await query_cache.invalidate(self.collection_name)
             logger.info(f"檔案處理完成: {filename} ({count} 個區塊)")
             
             return True, f"成功處理 {count} 個文字區塊"
         
         except Exception as e:
             logger.error(f"處理檔案失敗: {e}")
+            self.text_store.delete(text_path)
             try:
                 await session.execute(
                     update(Document).where(Document.id == doc.id).values(status="failed")
@@ -182,22 +297,33 @@ class RAGService:
         self,
         query: str,
         category: str = None,
-        top_k: int = 5
+        top_k: int = 5,
+        mmr: bool = None,
+        mmr_lambda: float = None
     ) -> List[Dict[str, Any]]:
-        """搜尋相關文件"""
+        """
+        搜尋相關文件
+        
+        mmr 啟用時先取回 settings.mmr_fetch_k 筆候選（含向量），再以 MMR 挑出 top_k 筆，
+        減少來自同一頁的近似重複區塊。mmr / mmr_lambda 為 None 時使用設定值。
+        """
         try:
-            collection_name = "public"
+            collection_name = self.collection_name
             
             filter_conditions = {}
             if category:
                 filter_conditions["category"] = category
             
+            use_mmr = settings.mmr_enabled if mmr is None else mmr
             results = vector_store.search(
                 collection_name=collection_name,
                 query=query,
-                top_k=top_k,
-                filter_conditions=filter_conditions if filter_conditions else None
+                top_k=max(top_k, settings.mmr_fetch_k) if use_mmr else top_k,
+                filter_conditions=filter_conditions if filter_conditions else None,
+                with_vectors=use_mmr
             )
+            if use_mmr:
+                results = self._diversify(results, top_k, mmr_lambda)
             
             logger.debug(f"搜尋完成: 查詢='{query}', 結果數={len(results)}")
             return results
@@ -205,6 +331,163 @@ class RAGService:
         except Exception as e:
             logger.error(f"搜尋失敗: {e}")
             return []
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        category: str = None,
+        top_k: int = 5,
+        mmr: bool = None,
+        mmr_lambda: float = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批次搜尋相關文件（結果順序與 queries 相同）
+        
+        檢索失敗時拋出例外而不是回傳空結果，避免呼叫端把失敗當成「沒有相關資料」。
+        """
+        try:
+            results = self._search_batch(queries, category, top_k, mmr, mmr_lambda)
+        except Exception as e:
+            logger.error(f"批次搜尋失敗: {e}")
+            raise
+        logger.debug(f"批次搜尋完成: 查詢數={len(queries)}")
+        return results
+    
+    async def asearch(
+        self,
+        query: str,
+        category: str = None,
+        top_k: int = 5,
+        mmr: bool = None,
+        mmr_lambda: float = None
+    ) -> List[Dict[str, Any]]:
+        """非同步搜尋，使用查詢快取（見 asearch_batch）"""
+        return (await self.asearch_batch([query], category, top_k, mmr, mmr_lambda))[0]
+    
+    async def asearch_batch(
+        self,
+        queries: List[str],
+        category: str = None,
+        top_k: int = 5,
+        mmr: bool = None,
+        mmr_lambda: float = None,
+        return_exceptions: bool = False
+    ) -> List[Any]:
+        """
+        非同步批次搜尋，使用查詢快取
+        
+        先以 (查詢, 分類, top_k, MMR 參數) 讀取檢索結果快取；未命中的查詢再讀取查詢向量快取，
+        只對仍未命中的查詢向量化，最後以一次 Qdrant 請求完成搜尋。
+        向量化與搜尋在執行緒中進行，不阻塞事件迴圈。
+        
+        向量化或搜尋失敗時拋出例外；return_exceptions=True 時改為在未命中快取的位置放入該例外
+        （與 asyncio.gather 相同），已命中快取的查詢仍回傳結果。
+        """
+        if not queries:
+            return []
+        
+        await self.sync_index_config()
+        use_mmr = settings.mmr_enabled if mmr is None else mmr
+        params_list = [
+            {
+                "query": query,
+                "category": category,
+                "top_k": top_k,
+                "mmr": use_mmr,
+                "mmr_lambda": (settings.mmr_lambda if mmr_lambda is None else mmr_lambda) if use_mmr else None,
+                "mmr_fetch_k": settings.mmr_fetch_k if use_mmr else None,
+            }
+            for query in queries
+        ]
+        
+        collection_name = self.collection_name
+        generation = await query_cache.get_generation(collection_name)
+        results = await query_cache.get_results(collection_name, generation, params_list)
+        missing = [i for i, r in enumerate(results) if r is None]
+        if not missing:
+            return results
+        
+        try:
+            missing_queries = [queries[i] for i in missing]
+            query_vectors = await self._query_vectors(missing_queries)
+            found = await to_thread(
+                self._search_batch, missing_queries, category, top_k, use_mmr, mmr_lambda, query_vectors
+            )
+        except Exception as e:
+            logger.error(f"批次搜尋失敗: {e}")
+            # 可能是別名已切換到其他嵌入模型的索引，下一次查詢立即重新檢查
+            self._index_checked_at = 0.0
+            if not return_exceptions:
+                raise
+            for i in missing:
+                results[i] = e
+            return results
+        
+        for i, r in zip(missing, found):
+            results[i] = r
+        await query_cache.set_results(
+            collection_name, generation, [params_list[i] for i in missing], found
+        )
+        logger.debug(f"批次搜尋完成: 查詢數={len(queries)}, 快取命中={len(queries) - len(missing)}")
+        return results
+    
+    async def _query_vectors(self, queries: List[str]) -> List[List[float]]:
+        """取得查詢向量，優先使用快取"""
+        model = vector_store.embedding_model
+        vectors = await query_cache.get_embeddings(model, queries)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            computed = await to_thread(vector_store.embed_batch, [queries[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+            await query_cache.set_embeddings(model, [queries[i] for i in missing], computed)
+        return vectors
+    
+    def _search_batch(
+        self,
+        queries: List[str],
+        category: str = None,
+        top_k: int = 5,
+        mmr: bool = None,
+        mmr_lambda: float = None,
+        query_vectors: List[List[float]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """批次搜尋（錯誤直接拋出）"""
+        filter_conditions = {}
+        if category:
+            filter_conditions["category"] = category
+        
+        use_mmr = settings.mmr_enabled if mmr is None else mmr
+        results = vector_store.search_batch(
+            collection_name=self.collection_name,
+            queries=queries,
+            top_k=max(top_k, settings.mmr_fetch_k) if use_mmr else top_k,
+            filter_conditions=filter_conditions if filter_conditions else None,
+            with_vectors=use_mmr,
+            query_vectors=query_vectors
+        )
+        if use_mmr:
+            results = [self._diversify(r, top_k, mmr_lambda) for r in results]
+        return results
+    
+    @staticmethod
+    def _diversify(results: List[Dict[str, Any]], top_k: int, mmr_lambda: float = None) -> List[Dict[str, Any]]:
+        """以 MMR 從候選中挑選 top_k 筆，並移除回傳結果中的向量"""
+        if not results:
+            return results
+        
+        selected = mmr_select(
+            [r["score"] for r in results],
+            [r["vector"] for r in results],
+            k=top_k,
+            lambda_mult=settings.mmr_lambda if mmr_lambda is None else mmr_lambda
+        )
+        diversified = []
+        for i in selected:
+            result = dict(results[i])
+            result.pop("vector", None)
+            diversified.append(result)
+        return diversified
 
 
 # 全域實例
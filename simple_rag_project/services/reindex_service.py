@@ -0,0 +1,318 @@
+"""重建索引服務 - 在背景重建新版本 Collection，完成後切換別名"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import select, update
+
+from models import Document
+from services.rag_service import rag_service
+from utils.cache import query_cache
+from utils.chunker import TextChunker
+from utils.database import get_session
+from utils.vector_store import vector_store, load_embedder
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReindexError(Exception):
+    """重建索引無法開始"""
+
+
+class ReindexService:
+    """
+    零停機重建索引
+
+    流程：
+        1. 建立新的版本化 Collection（例如 public_v2），查詢持續使用別名指向的舊 Collection
+        2. 讀取每份已完成文件儲存的擷取文字（舊文件則解析原始檔），重新分塊、向量化並寫入新 Collection
+        3. 持有 rag_service.ingest_lock 比對所有已完成文件與已寫入的文件，補齊後原子性地切換別名
+        4. 依 drop_old 刪除舊 Collection；切換前失敗則刪除寫入一半的新 Collection
+
+    別名在第一次寫入時就已建立（見 VectorStore.ensure_alias）。舊版直接使用實體 Collection 的部署
+    無法原子性切換，只在 drop_old=true 時刪除實體 Collection 後改為別名。
+
+    文件 ID 在開始處理時就已分配，完成順序不一定與 ID 相同，因此以已寫入的文件 ID 集合追蹤進度，
+    而不是以最大 ID 為界。進度寫入 settings.reindex_state_path，程序中斷後重新啟動會略過已寫入的文件。
+    ingest_lock 只在單一程序內有效，多 worker 部署時請在重建期間暫停上傳。
+    """
+
+    def __init__(self):
+        self.state_path = settings.reindex_state_path
+        self.state: Optional[Dict[str, Any]] = self._load_state()
+        self._task: Optional[asyncio.Task] = None
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"無法讀取重建索引狀態: {e}")
+            return None
+
+    def _save_state(self):
+        self.state["updated_at"] = datetime.utcnow().isoformat()
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        # 先寫暫存檔再取代，避免中斷時留下損壞的狀態檔
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def get_status(self) -> Optional[Dict[str, Any]]:
+        """取得目前或最後一次重建索引的進度"""
+        return self.state
+
+    @staticmethod
+    def allowed_models() -> set:
+        """可用於重建索引的嵌入模型：目前使用中的模型、EMBEDDING_MODEL 與 EMBEDDING_MODEL_ALLOWLIST"""
+        allowlist = {m.strip() for m in settings.embedding_model_allowlist.split(",") if m.strip()}
+        return allowlist | {settings.embedding_model, vector_store.embedding_model}
+
+    async def start(
+        self,
+        embedding_model: str = None,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        drop_old: bool = False
+    ) -> Dict[str, Any]:
+        """開始新的重建索引工作"""
+        if self.running or (self.state and self.state["status"] == "running"):
+            raise ReindexError("已有重建索引工作進行中")
+
+        if embedding_model and embedding_model not in self.allowed_models():
+            raise ValueError(f"不允許的嵌入模型: {embedding_model}（請加入 EMBEDDING_MODEL_ALLOWLIST）")
+
+        chunk_size = chunk_size or rag_service.chunker.chunk_size
+        chunk_overlap = chunk_overlap if chunk_overlap is not None else rag_service.chunker.chunk_overlap
+        TextChunker(chunk_size, chunk_overlap)  # 提前驗證參數
+
+        alias = rag_service.collection_name
+        # 舊版部署直接使用實體 Collection：改為別名必須刪除它，只有明確要求捨棄舊索引時才進行
+        legacy = await asyncio.to_thread(vector_store.is_physical_collection, alias)
+        if legacy and not drop_old:
+            raise ReindexError(f"{alias} 為實體 Collection，轉換為別名會刪除它，請設定 drop_old=true")
+
+        self.state = {
+            "job_id": str(uuid4()),
+            "alias": alias,
+            "target_collection": vector_store.next_version_name(alias),
+            "previous_collection": None,
+            "swapped": False,
+            "embedding_model": embedding_model or vector_store.embedding_model,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "drop_old": drop_old,
+            "status": "running",
+            "total": 0,
+            "processed": 0,
+            "chunks": 0,
+            "skipped": [],
+            "indexed_ids": [],
+            "started_at": datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "error": None,
+            "cleanup_error": None,
+        }
+        self._save_state()
+        self._task = asyncio.create_task(self._run())
+        return self.state
+
+    async def resume_if_needed(self):
+        """啟動時若有未完成的工作則繼續執行"""
+        if self.state and self.state["status"] == "running" and not self.running:
+            # 舊版狀態檔沒有 indexed_ids，只能全部重新寫入（Point ID 固定，重複寫入只會覆蓋）
+            self.state.setdefault("indexed_ids", [])
+            self.state.setdefault("swapped", False)
+            logger.info(f"繼續未完成的重建索引: {self.state['target_collection']} (已完成 {len(self.state['indexed_ids'])} 份文件)")
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        state = self.state
+        try:
+            # 切換後才中斷的工作只剩清理舊 Collection
+            if not state["swapped"]:
+                await self._build_and_swap()
+        except Exception as e:
+            logger.error(f"重建索引失敗: {e}")
+            state["status"] = "failed"
+            state["error"] = str(e)
+            if not state["swapped"]:
+                await self._discard_target()
+            state["finished_at"] = datetime.utcnow().isoformat()
+            self._save_state()
+            return
+
+        previous = state["previous_collection"]
+        if previous and state["drop_old"]:
+            # 別名已切換，刪除舊 Collection 失敗不影響結果，只記錄下來供手動清理
+            try:
+                await asyncio.to_thread(vector_store.delete_collection, previous)
+            except Exception as e:
+                logger.error(f"刪除舊 Collection {previous} 失敗: {e}")
+                state["cleanup_error"] = str(e)
+
+        state["status"] = "completed"
+        state["finished_at"] = datetime.utcnow().isoformat()
+        self._save_state()
+        logger.info(f"重建索引完成: {state['alias']} -> {state['target_collection']}")
+
+    async def _build_and_swap(self):
+        """寫入新 Collection 並切換別名，切換後立即記錄在狀態檔"""
+        state = self.state
+        if state["embedding_model"] == vector_store.embedding_model:
+            embedder = vector_store.embedder
+        else:
+            embedder = await asyncio.to_thread(load_embedder, state["embedding_model"])
+        chunker = TextChunker(state["chunk_size"], state["chunk_overlap"])
+
+        # 嵌入模型與分塊參數記錄在新 Collection，重新啟動或其他 worker 切換時據此載入
+        await asyncio.to_thread(
+            vector_store.ensure_collection,
+            state["target_collection"],
+            embedder.get_sentence_embedding_dimension(),
+            {
+                "embedding_model": state["embedding_model"],
+                "chunk_size": state["chunk_size"],
+                "chunk_overlap": state["chunk_overlap"],
+            }
+        )
+
+        # 主要階段：不阻擋上傳，逐批處理直到沒有新文件
+        while await self._index_pending(embedder, chunker):
+            pass
+
+        # 切換階段：暫停寫入，補齊所有尚未寫入的已完成文件後切換別名
+        async with rag_service.ingest_lock:
+            while await self._index_pending(embedder, chunker):
+                pass
+            previous = await asyncio.to_thread(
+                vector_store.swap_alias, state["alias"], state["target_collection"], state["drop_old"]
+            )
+            state["swapped"] = True
+            state["previous_collection"] = previous
+            self._save_state()
+
+            if embedder is not vector_store.embedder:
+                vector_store.use_embedder(state["embedding_model"], embedder)
+            rag_service.chunker = chunker
+            try:
+                vector_store.index_config = await asyncio.to_thread(
+                    vector_store.get_index_config, state["alias"]
+                )
+                await query_cache.invalidate(state["alias"])
+            except Exception as e:
+                # 別名已切換且已換用新的嵌入模型，索引設定會在下一次定期檢查時載入
+                logger.error(f"切換後讀取索引設定失敗: {e}")
+
+    async def _discard_target(self):
+        """刪除未切換的新 Collection，避免留下寫入一半的版本"""
+        target = self.state["target_collection"]
+        try:
+            if await asyncio.to_thread(vector_store.is_physical_collection, target):
+                await asyncio.to_thread(vector_store.delete_collection, target)
+        except Exception as e:
+            logger.error(f"刪除未完成的 Collection {target} 失敗: {e}")
+            self.state["cleanup_error"] = str(e)
+
+    async def _index_pending(self, embedder, chunker: TextChunker, batch_size: int = 20) -> bool:
+        """處理一批尚未寫入新 Collection 的已完成文件，回傳是否有處理任何文件"""
+        state = self.state
+        indexed = set(state["indexed_ids"])
+        async with get_session() as session:
+            completed_ids = (await session.execute(
+                select(Document.id).where(Document.status == "completed")
+            )).scalars().all()
+            pending = sorted(set(completed_ids) - indexed)[:batch_size]
+            state["total"] = len(indexed.union(completed_ids))
+            docs = (await session.execute(
+                select(Document).where(Document.id.in_(pending)).order_by(Document.id)
+            )).scalars().all() if pending else []
+
+        for doc in docs:
+            try:
+                state["chunks"] += await self._index_document(doc, embedder, chunker)
+            except Exception as e:
+                logger.error(f"重建索引略過文件 {doc.id}: {e}")
+                state["skipped"].append({"doc_id": doc.id, "filename": doc.filename, "reason": str(e)})
+            state["indexed_ids"].append(doc.id)
+            state["processed"] = len(state["indexed_ids"])
+        # 每批寫入一次狀態檔（indexed_ids 隨文件數成長，不逐份重寫）
+        if docs:
+            self._save_state()
+
+        return bool(docs)
+
+    async def _index_document(self, doc: Document, embedder, chunker: TextChunker) -> int:
+        """重建單一文件的向量"""
+        target = self.state["target_collection"]
+
+        has_text = doc.text_path and os.path.exists(doc.text_path)
+        if has_text or (doc.file_path and os.path.exists(doc.file_path)):
+            # 優先讀取擷取文字儲存，舊文件則解析 PDF 並補存
+            pages, text_path = await asyncio.to_thread(rag_service.load_document_pages, doc)
+            if text_path and text_path != doc.text_path:
+                async with get_session() as session:
+                    await session.execute(
+                        update(Document).where(Document.id == doc.id).values(text_path=text_path)
+                    )
+            texts, metadata, ids = rag_service.prepare_chunks(
+                pages, doc.id, doc.filename, doc.category, chunker=chunker
+            )
+        else:
+            # 沒有原始檔（舊資料）：沿用目前索引中的區塊文字重新向量化
+            texts, metadata, ids = await asyncio.to_thread(self._chunks_from_index, doc)
+            if not texts:
+                raise ValueError("找不到原始檔，目前索引中也沒有此文件的區塊")
+
+        if not texts:
+            return 0
+
+        vectors = await asyncio.to_thread(lambda: embedder.encode(texts).tolist())
+        return await asyncio.to_thread(
+            vector_store.add_documents, target, texts, metadata, ids, vectors
+        )
+
+    def _chunks_from_index(self, doc: Document):
+        """從別名目前指向的 Collection 讀回文件的區塊"""
+        alias = self.state["alias"]
+        if not vector_store.collection_exists(alias):
+            return [], [], []
+
+        # 舊資料的 payload 沒有 doc_id，只能依檔名比對；同名文件只由第一份取用
+        payloads = list(vector_store.scroll_payloads(alias, {"doc_id": doc.id}))
+        if not payloads and not self._filename_claimed(doc):
+            payloads = [
+                payload for payload in vector_store.scroll_payloads(alias, {"filename": doc.filename})
+                if "doc_id" not in payload
+            ]
+
+        texts: List[str] = []
+        metadata: List[Dict[str, Any]] = []
+        for payload in payloads:
+            texts.append(payload.get("text", ""))
+            metadata.append({**{k: v for k, v in payload.items() if k != "text"}, "doc_id": doc.id})
+        ids = [rag_service.point_id(doc.id, i) for i in range(len(texts))]
+        return texts, metadata, ids
+
+    def _filename_claimed(self, doc: Document) -> bool:
+        claimed = self.state.setdefault("claimed_filenames", [])
+        if doc.filename in claimed:
+            return True
+        claimed.append(doc.filename)
+        return False
+
+
+# 全域實例
+reindex_service = ReindexService()
@@ -0,0 +1,19 @@
+"""測試環境：在匯入應用模組前設定隔離的資料目錄與 In-Memory 服務"""
+import os
+import sys
+import tempfile
+
+_WORKDIR = tempfile.mkdtemp(prefix="simple_rag_test_")
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_WORKDIR, 'test.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_WORKDIR, "uploads")
+os.environ["TEXT_STORE_DIR"] = os.path.join(_WORKDIR, "texts")
+os.environ["REINDEX_STATE_PATH"] = os.path.join(_WORKDIR, "reindex_state.json")
+os.environ["PROFILE_DIR"] = os.path.join(_WORKDIR, "profiles")
+os.environ["QDRANT_HOST"] = ":memory:"
+os.environ["LLM_TYPE"] = "mock"
+os.environ["CACHE_BACKEND"] = "none"
+os.environ["DEBUG"] = "0"
+
+# 應用模組以專案目錄為匯入根目錄（from config import settings）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,177 @@
+"""准入控制測試"""
+import asyncio
+
+import pytest
+
+from utils import admission
+from utils.admission import ConcurrencyLimiter, RateLimiter
+from utils.metrics import metrics
+
+
+def _gauges(name):
+    gauges = metrics.snapshot()["gauges"]
+    return gauges[f"{name}_inflight"], gauges[f"{name}_queue_depth"]
+
+
+def test_full_queue_is_rejected_immediately():
+    async def run():
+        limiter = ConcurrencyLimiter("t_full", max_concurrency=1, max_queue=1, queue_timeout=10)
+        assert await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        assert limiter.queue_depth == 1
+        assert await limiter.acquire() is False
+
+        limiter.release()
+        assert await queued is True
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter._active == 0
+    assert _gauges("t_full") == (0, 0)
+
+
+def test_queue_timeout_rejects_and_discards_waiter():
+    async def run():
+        limiter = ConcurrencyLimiter("t_timeout", max_concurrency=1, max_queue=1, queue_timeout=0.01)
+        assert await limiter.acquire()
+
+        assert await limiter.acquire() is False
+        assert limiter.queue_depth == 0
+        assert _gauges("t_timeout") == (1, 0)
+
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter._active == 0
+    assert _gauges("t_timeout") == (0, 0)
+
+
+def test_release_hands_slot_to_oldest_waiter():
+    async def run():
+        limiter = ConcurrencyLimiter("t_handoff", max_concurrency=1, max_queue=2, queue_timeout=10)
+        assert await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        limiter.release()
+        # 名額直接交給等待者，並行數不變
+        assert limiter._active == 1
+        assert await first is True
+        assert not second.done()
+        assert limiter.queue_depth == 1
+
+        limiter.release()
+        assert await second is True
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter._active == 0
+    assert _gauges("t_handoff") == (0, 0)
+
+
+@pytest.mark.parametrize("other_waiter", [False, True])
+def test_cancellation_after_slot_granted_returns_the_slot(other_waiter):
+    async def run():
+        limiter = ConcurrencyLimiter("t_cancel", max_concurrency=1, max_queue=2, queue_timeout=10)
+        assert await limiter.acquire()
+        granted = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        other = None
+        if other_waiter:
+            other = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+
+        # 名額交給 granted 後、它恢復執行前被取消
+        limiter.release()
+        granted.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await granted
+
+        if other is not None:
+            # 歸還的名額交給下一個等待者
+            assert await other is True
+            assert limiter._active == 1
+            limiter.release()
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter._active == 0
+    assert limiter.queue_depth == 0
+    assert _gauges("t_cancel") == (0, 0)
+
+
+def test_cancellation_while_queued_discards_waiter():
+    async def run():
+        limiter = ConcurrencyLimiter("t_cancel_queued", max_concurrency=1, max_queue=1, queue_timeout=10)
+        assert await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert limiter.queue_depth == 0
+
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter._active == 0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_refills_at_configured_rate(clock):
+    limiter = RateLimiter(rate_per_minute=60, burst=3)
+
+    assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("a") == pytest.approx(1.0)
+
+    clock[0] += 0.5
+    assert limiter.acquire("a") == pytest.approx(0.5)
+
+    clock[0] += 0.5
+    assert limiter.acquire("a") == 0.0
+
+    # 長時間閒置最多回補到 burst
+    clock[0] += 3600
+    assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("a") > 0
+
+
+def test_token_bucket_cost_is_clamped_to_burst(clock):
+    limiter = RateLimiter(rate_per_minute=120, burst=5)
+
+    assert limiter.acquire("a", cost=50) == 0.0
+    assert limiter.acquire("a", cost=2) == pytest.approx(1.0)
+    assert limiter.acquire("b", cost=5) == 0.0
+
+
+def test_token_bucket_evicts_least_recent_client(clock):
+    limiter = RateLimiter(rate_per_minute=60, burst=1, max_clients=2)
+
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("a")
+    limiter.acquire("c")
+
+    assert list(limiter._buckets) == ["a", "c"]
+
+
+def test_zero_rate_disables_limit():
+    limiter = RateLimiter(rate_per_minute=0, burst=1)
+
+    assert not limiter.enabled
+    assert all(limiter.acquire("a", cost=100) == 0.0 for _ in range(10))
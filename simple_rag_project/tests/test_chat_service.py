@@ -0,0 +1,34 @@
+"""ChatService 批次問答測試"""
+import asyncio
+
+from sqlalchemy import func, select
+
+from models import ChatHistory
+from services.chat_service import chat_service
+from services.rag_service import rag_service
+from utils.database import async_session, init_db
+
+
+async def _batch_with_failed_retrieval(monkeypatch):
+    await init_db()
+
+    def fail(*args, **kwargs):
+        raise ConnectionError("qdrant unavailable")
+
+    monkeypatch.setattr(rag_service, "_search_batch", fail)
+    async with async_session() as session:
+        before = await session.scalar(select(func.count()).select_from(ChatHistory))
+        items = await chat_service.batch_query(session, ["What is RAG?", "Who wrote it?"])
+        after = await session.scalar(select(func.count()).select_from(ChatHistory))
+    return items, after - before
+
+
+def test_batch_retrieval_failure_is_reported_per_item(monkeypatch):
+    items, new_rows = asyncio.run(_batch_with_failed_retrieval(monkeypatch))
+
+    assert [item["question"] for item in items] == ["What is RAG?", "Who wrote it?"]
+    for item in items:
+        assert item["answer"] is None
+        assert item["sources"] == []
+        assert "qdrant unavailable" in item["error"]
+    assert new_rows == 0
@@ -0,0 +1,65 @@
+"""TextChunker 測試"""
+import pytest
+
+from utils.chunker import TextChunker, count_tokens
+
+
+def test_sentence_starting_a_page_reports_that_page():
+    chunks = TextChunker(5, 0).split_pages(["Hello world one two.", "Second page sentence here."])
+
+    assert [(c["text"], c["page_start"], c["page_end"]) for c in chunks] == [
+        ("Hello world one two.", 1, 1),
+        ("Second page sentence here.", 2, 2),
+    ]
+
+
+@pytest.mark.parametrize("blank", ["", "   ", "\n\n"])
+def test_blank_page_is_not_counted_in_page_range(blank):
+    chunks = TextChunker(5, 0).split_pages(["Hello world one two.", blank, "Tail."])
+
+    assert [(c["text"], c["page_start"], c["page_end"]) for c in chunks] == [
+        ("Hello world one two.", 1, 1),
+        ("Tail.", 3, 3),
+    ]
+
+
+def test_sentence_spanning_pages_keeps_both_pages():
+    chunks = TextChunker(50, 0).split_pages(["The sentence starts here", "and ends on page two."])
+
+    assert len(chunks) == 1
+    assert (chunks[0]["page_start"], chunks[0]["page_end"]) == (1, 2)
+
+
+def test_start_page_offsets_page_numbers():
+    chunks = TextChunker(5, 0).split_pages(["First page text.", "Second page text."], start_page=10)
+
+    assert [(c["page_start"], c["page_end"]) for c in chunks] == [(10, 10), (11, 11)]
+
+
+def test_long_sentence_is_split_at_token_boundaries():
+    chunks = TextChunker(3, 0).split_pages(["a b", "c d e f g h i"])
+
+    assert [c["text"] for c in chunks] == ["a b\nc", "d e f", "g h i"]
+    assert [(c["page_start"], c["page_end"]) for c in chunks] == [(1, 2), (2, 2), (2, 2)]
+
+
+def test_chunks_respect_size_and_overlap():
+    text = " ".join(f"Sentence number {i} is here." for i in range(30))
+    chunker = TextChunker(20, 6)
+    chunks = chunker.split_text(text)
+
+    assert all(count_tokens(chunk) <= 20 for chunk in chunks)
+    # 相鄰區塊以完整句子重疊
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.split(".")[0] in previous
+
+
+def test_cjk_text_splits_on_chinese_punctuation():
+    chunks = TextChunker(8, 0).split_text("今天天氣很好。我們去公園散步！")
+
+    assert chunks == ["今天天氣很好。", "我們去公園散步！"]
+
+
+def test_overlap_must_be_smaller_than_size():
+    with pytest.raises(ValueError):
+        TextChunker(10, 10)
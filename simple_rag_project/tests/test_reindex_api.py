@@ -0,0 +1,38 @@
+"""重建索引 API 權限與參數驗證測試"""
+import pytest
+from fastapi.testclient import TestClient
+
+from config import settings
+from main import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_admin_token", "secret")
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("method", ["get", "post"])
+def test_reindex_requires_admin_token(client, method):
+    response = client.request(method, "/knowledge/reindex", json={})
+
+    assert response.status_code == 403
+
+
+def test_reindex_disabled_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_admin_token", "")
+
+    response = client.post("/knowledge/reindex", json={}, headers={"X-Admin-Token": ""})
+
+    assert response.status_code == 403
+
+
+def test_reindex_rejects_model_outside_allowlist(client):
+    response = client.post(
+        "/knowledge/reindex",
+        json={"embedding_model": "someone/untrusted-model"},
+        headers={"X-Admin-Token": "secret"}
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,48 @@
+"""ReindexService 失敗處理測試"""
+import asyncio
+
+from services.rag_service import rag_service
+from services.reindex_service import reindex_service
+from utils.database import init_db
+from utils.vector_store import vector_store
+
+
+async def _reindex(**kwargs):
+    """執行一次重建索引，回傳 (開始前別名指向的 Collection, 最終狀態)"""
+    await init_db()
+    vector_store.ensure_alias(rag_service.collection_name)
+    previous = vector_store.get_alias_target(rag_service.collection_name)
+    state = await reindex_service.start(**kwargs)
+    await reindex_service._task
+    return previous, state
+
+
+def test_failed_job_deletes_unswapped_target(monkeypatch):
+    async def fail(*args, **kwargs):
+        raise RuntimeError("embedding backend down")
+
+    monkeypatch.setattr(reindex_service, "_index_pending", fail)
+
+    previous, state = asyncio.run(_reindex())
+
+    assert state["status"] == "failed"
+    assert not state["swapped"]
+    assert not vector_store.is_physical_collection(state["target_collection"])
+    assert vector_store.get_alias_target(rag_service.collection_name) == previous
+    # 下一次重建重新使用同一個版本名稱，不會留下寫入一半的 Collection
+    assert vector_store.next_version_name(rag_service.collection_name) == state["target_collection"]
+
+
+def test_cleanup_failure_after_swap_still_completes(monkeypatch):
+    def fail(collection_name):
+        raise ConnectionError("qdrant timeout")
+
+    monkeypatch.setattr(vector_store, "delete_collection", fail)
+
+    previous, state = asyncio.run(_reindex(drop_old=True))
+
+    assert state["status"] == "completed"
+    assert state["swapped"]
+    assert state["previous_collection"] == previous
+    assert "qdrant timeout" in state["cleanup_error"]
+    assert vector_store.get_alias_target(rag_service.collection_name) == state["target_collection"]
@@ -0,0 +1,38 @@
+"""VectorStore 別名與版本化 Collection 測試"""
+import pytest
+
+from utils.vector_store import vector_store
+
+
+def test_missing_name_is_created_as_alias_to_versioned_collection():
+    vector_store.ensure_alias("alias_first", metadata={"chunk_size": 100})
+
+    assert vector_store.get_alias_target("alias_first") == "alias_first_v1"
+    assert not vector_store.is_physical_collection("alias_first")
+    assert vector_store.get_index_config("alias_first")["chunk_size"] == 100
+
+    vector_store.add_documents("alias_first", ["hello"])
+    assert vector_store.get_alias_target("alias_first") == "alias_first_v1"
+
+
+def test_swap_keeps_previous_collection():
+    vector_store.ensure_alias("swap_keep")
+    vector_store.ensure_collection("swap_keep_v2")
+
+    assert vector_store.swap_alias("swap_keep", "swap_keep_v2") == "swap_keep_v1"
+    assert vector_store.get_alias_target("swap_keep") == "swap_keep_v2"
+    assert vector_store.is_physical_collection("swap_keep_v1")
+
+
+def test_legacy_physical_collection_is_only_replaced_on_request():
+    vector_store.ensure_collection("legacy")
+    vector_store.add_documents("legacy", ["old data"])
+    vector_store.ensure_collection("legacy_v1")
+
+    with pytest.raises(ValueError):
+        vector_store.swap_alias("legacy", "legacy_v1")
+    assert vector_store.is_physical_collection("legacy")
+    assert vector_store.client.count("legacy").count == 1
+
+    assert vector_store.swap_alias("legacy", "legacy_v1", replace_collection=True) is None
+    assert vector_store.get_alias_target("legacy") == "legacy_v1"
@@ -1,6 +1,7 @@
 from utils.database import get_session, init_db
 from utils.llm import LLMService, llm_service
 from utils.vector_store import VectorStore, vector_store
+from utils.chunker import TextChunker
 
 __all__ = [
     "get_session", 
@@ -8,5 +9,6 @@ __all__ = [
     "LLMService", 
     "llm_service",
     "VectorStore", 
-    "vector_store"
+    "vector_store",
+    "TextChunker"
 ]
@@ -0,0 +1,232 @@
+"""准入控制 - 端點並行上限、有界等待佇列與每用戶端速率限制"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Tuple
+
+from fastapi import HTTPException, Request
+
+from config import settings
+from utils.metrics import metrics
+
+
+class RateLimiter:
+    """每個用戶端一個 token bucket"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_clients: int = 10000):
+        self.rate = rate_per_minute / 60
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, key: str, cost: float = 1) -> float:
+        """
+        取用 token
+
+        Args:
+            key: 用戶端識別
+            cost: 此請求消耗的 token 數（例如批次查詢的問題數），超過 burst 時以 burst 計
+
+        Returns:
+            0 表示允許；否則為需要等待的秒數
+        """
+        if not self.enabled:
+            return 0.0
+        cost = min(cost, self.burst)
+
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        if tokens >= cost:
+            tokens -= cost
+            wait = 0.0
+        else:
+            wait = (cost - tokens) / self.rate
+
+        # 以 LRU 方式保留最近的用戶端，避免記憶體無限成長
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """
+    並行上限加上有界的 FIFO 等待佇列
+
+    名額額滿時最多 max_queue 個請求排隊，每個最多等待 queue_timeout 秒；
+    佇列已滿或等待逾時都直接拒絕，避免請求堆積拖慢已接受的請求。
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        if max_concurrency < 1:
+            raise ValueError(f"{name} 的並行上限必須大於 0")
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_duration = 1.0  # 處理時間的指數移動平均（秒），用於估計 Retry-After
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """依目前排隊數與平均處理時間估計建議的重試秒數"""
+        rounds = (self.queue_depth + 1) / self.max_concurrency
+        return min(60, max(1, math.ceil(rounds * self._avg_duration)))
+
+    async def acquire(self) -> bool:
+        """
+        取得處理名額
+
+        Returns:
+            是否取得名額（佇列已滿或等待逾時時為 False）
+        """
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self._update_gauges()
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # 已被分配名額才取消時要歸還，否則名額會永久遺失
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+
+        if waiter.done():
+            return True
+        self._discard(waiter)
+        return False
+
+    def release(self):
+        """歸還名額；有人排隊時直接交給最早的等待者"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self._active -= 1
+        self._update_gauges()
+
+    def record_duration(self, seconds: float):
+        self._avg_duration = 0.8 * self._avg_duration + 0.2 * seconds
+
+    def _discard(self, waiter: asyncio.Future):
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._update_gauges()
+
+    def _update_gauges(self):
+        metrics.set_gauge(f"{self.name}_inflight", self._active)
+        metrics.set_gauge(f"{self.name}_queue_depth", len(self._waiters))
+
+
+class AdmissionController:
+    """單一端點的准入控制：先檢查用戶端速率，再取得處理名額"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        rate_per_minute: float,
+        burst: int
+    ):
+        self.name = name
+        self.limiter = ConcurrencyLimiter(name, max_concurrency, max_queue, queue_timeout)
+        self.rate_limiter = RateLimiter(rate_per_minute, burst)
+
+    @staticmethod
+    def client_key(request: Request) -> str:
+        return request.client.host if request.client else "unknown"
+
+    @asynccontextmanager
+    async def admit(self, request: Request, cost: float = 1):
+        """
+        在准入控制下處理請求
+
+        Args:
+            request: 目前的請求
+            cost: 速率限制消耗的 token 數
+
+        Raises:
+            HTTPException: 超過用戶端速率限制（429）或端點已滿載（503），附 Retry-After
+        """
+        wait = self.rate_limiter.acquire(self.client_key(request), cost)
+        if wait > 0:
+            metrics.incr(f"{self.name}_rate_limited_total")
+            raise HTTPException(
+                status_code=429,
+                detail="請求過於頻繁，請稍後再試",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+        queued_at = time.perf_counter()
+        if not await self.limiter.acquire():
+            metrics.incr(f"{self.name}_rejected_total")
+            raise HTTPException(
+                status_code=503,
+                detail="服務忙碌中，請稍後再試",
+                headers={"Retry-After": str(self.limiter.retry_after())}
+            )
+
+        started_at = time.perf_counter()
+        metrics.incr(f"{self.name}_admitted_total")
+        metrics.incr(f"{self.name}_queue_wait_seconds_total", started_at - queued_at)
+        try:
+            yield
+        finally:
+            self.limiter.record_duration(time.perf_counter() - started_at)
+            self.limiter.release()
+
+
+# 全域實例
+chat_admission = AdmissionController(
+    "chat_query",
+    max_concurrency=settings.chat_max_concurrency,
+    max_queue=settings.chat_max_queue,
+    queue_timeout=settings.admission_queue_timeout,
+    rate_per_minute=settings.chat_rate_limit,
+    burst=settings.chat_rate_burst
+)
+# 批次查詢另設名額，速率限制以問題數計算
+batch_admission = AdmissionController(
+    "chat_batch",
+    max_concurrency=settings.batch_max_inflight,
+    max_queue=settings.batch_max_queue,
+    queue_timeout=settings.admission_queue_timeout,
+    rate_per_minute=settings.batch_rate_limit,
+    burst=settings.batch_rate_burst
+)
+upload_admission = AdmissionController(
+    "knowledge_upload",
+    max_concurrency=settings.upload_max_concurrency,
+    max_queue=settings.upload_max_queue,
+    queue_timeout=settings.admission_queue_timeout,
+    rate_per_minute=settings.upload_rate_limit,
+    burst=settings.upload_rate_burst
+)
@@ -0,0 +1,258 @@
+"""查詢快取 - 跨 worker 共用查詢向量與檢索結果"""
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "rag"
+# 向量以 little-endian float32 儲存，384 維約 1.5KB
+_VECTOR_DTYPE = np.dtype("<f4")
+
+
+class MemoryCache:
+    """程序內快取（Redis 無法使用時的替代品，也可用於測試）"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+
+    async def ping(self):
+        return True
+
+    def _get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._get(key)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return [self._get(key) for key in keys]
+
+    async def mset(self, items: Dict[str, bytes], ttl: Optional[int] = None):
+        for key, value in items.items():
+            self._set(key, value, ttl)
+
+    async def incr(self, key: str) -> int:
+        value = int(self._get(key) or 0) + 1
+        self._set(key, str(value).encode())
+        return value
+
+
+class RedisCache:
+    """以 utils.redis_config 的 redis_client 實作的共用快取"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def ping(self):
+        return await self.client.ping()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return await self.client.mget(keys)
+
+    async def mset(self, items: Dict[str, bytes], ttl: Optional[int] = None):
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, value, ex=ttl)
+            await pipe.execute()
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+
+class QueryCache:
+    """
+    查詢向量與檢索結果快取
+
+    鍵值格式：
+        rag:emb:{嵌入模型}:{查詢雜湊}                  -> float32 向量
+        rag:gen:{collection}                           -> 版本號，匯入或切換索引時遞增
+        rag:ret:{collection}:{版本號}:{參數雜湊}        -> 檢索結果 JSON
+
+    檢索結果的鍵含版本號，寫入新文件後遞增版本號即讓所有 worker 的舊結果失效，
+    舊鍵由 TTL 自然清除。查詢向量只與嵌入模型有關，不需隨版本失效。
+    快取發生錯誤時視為未命中，並暫停使用一段時間，不影響查詢本身。
+    """
+
+    def __init__(self, backend: str = None, retry_interval: float = 30):
+        self.backend_name = backend or settings.cache_backend
+        self.retry_interval = retry_interval
+        self._backend = None
+        self._connected = False
+        self._paused_until = 0.0
+
+    async def connect(self):
+        """選擇快取後端；Redis 無法連線時改用程序內快取"""
+        self._connected = True
+        if self.backend_name == "none":
+            self._backend = None
+        elif self.backend_name == "memory":
+            self._backend = MemoryCache()
+        elif self.backend_name == "redis":
+            from utils.redis_config import redis_client
+            try:
+                await redis_client.ping()
+                self._backend = RedisCache(redis_client)
+                logger.info(f"查詢快取使用 Redis ({settings.redis_host}:{settings.redis_port})")
+            except Exception as e:
+                logger.warning(f"無法連線 Redis，查詢快取改用程序內快取（不跨 worker 共用）: {e}")
+                self._backend = MemoryCache()
+        else:
+            raise ValueError(f"未知的快取後端: {self.backend_name}")
+
+    async def _get_backend(self):
+        if not self._connected:
+            await self.connect()
+        if self._paused_until > time.monotonic():
+            return None
+        return self._backend
+
+    def _on_error(self, action: str, error: Exception):
+        logger.warning(f"快取{action}失敗，暫停使用 {self.retry_interval:.0f} 秒: {error}")
+        metrics.incr("cache_errors_total")
+        self._paused_until = time.monotonic() + self.retry_interval
+
+    @staticmethod
+    def _digest(value: str) -> str:
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+    def _embedding_key(self, model: str, text: str) -> str:
+        return f"{_KEY_PREFIX}:emb:{model}:{self._digest(text)}"
+
+    @staticmethod
+    def _generation_key(collection: str) -> str:
+        return f"{_KEY_PREFIX}:gen:{collection}"
+
+    def _results_key(self, collection: str, generation: int, params: Dict[str, Any]) -> str:
+        digest = self._digest(json.dumps(params, sort_keys=True, ensure_ascii=False))
+        return f"{_KEY_PREFIX}:ret:{collection}:{generation}:{digest}"
+
+    async def get_embeddings(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """讀取查詢向量，未命中的位置為 None"""
+        backend = await self._get_backend()
+        if backend is None or not texts:
+            return [None] * len(texts)
+        try:
+            values = await backend.mget([self._embedding_key(model, text) for text in texts])
+        except Exception as e:
+            self._on_error("讀取", e)
+            return [None] * len(texts)
+
+        vectors = [
+            np.frombuffer(value, dtype=_VECTOR_DTYPE).tolist() if value is not None else None
+            for value in values
+        ]
+        hits = sum(vector is not None for vector in vectors)
+        metrics.incr("embedding_cache_hits_total", hits)
+        metrics.incr("embedding_cache_misses_total", len(vectors) - hits)
+        return vectors
+
+    async def set_embeddings(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """寫入查詢向量"""
+        backend = await self._get_backend()
+        if backend is None or not texts:
+            return
+        items = {
+            self._embedding_key(model, text): np.asarray(vector, dtype=_VECTOR_DTYPE).tobytes()
+            for text, vector in zip(texts, vectors)
+        }
+        try:
+            await backend.mset(items, ttl=settings.embedding_cache_ttl)
+        except Exception as e:
+            self._on_error("寫入", e)
+
+    async def get_generation(self, collection: str) -> int:
+        """目前的索引版本號（快取無法使用時為 0）"""
+        backend = await self._get_backend()
+        if backend is None:
+            return 0
+        try:
+            return int(await backend.get(self._generation_key(collection)) or 0)
+        except Exception as e:
+            self._on_error("讀取", e)
+            return 0
+
+    async def invalidate(self, collection: str):
+        """遞增版本號，讓該 Collection 的所有檢索結果快取失效"""
+        backend = await self._get_backend()
+        if backend is None:
+            return
+        try:
+            await backend.incr(self._generation_key(collection))
+        except Exception as e:
+            self._on_error("失效", e)
+
+    async def get_results(
+        self,
+        collection: str,
+        generation: int,
+        params_list: Sequence[Dict[str, Any]]
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """讀取檢索結果，未命中的位置為 None"""
+        backend = await self._get_backend()
+        if backend is None or not params_list:
+            return [None] * len(params_list)
+        try:
+            values = await backend.mget([
+                self._results_key(collection, generation, params) for params in params_list
+            ])
+        except Exception as e:
+            self._on_error("讀取", e)
+            return [None] * len(params_list)
+
+        results = [json.loads(value) if value is not None else None for value in values]
+        hits = sum(result is not None for result in results)
+        metrics.incr("retrieval_cache_hits_total", hits)
+        metrics.incr("retrieval_cache_misses_total", len(results) - hits)
+        return results
+
+    async def set_results(
+        self,
+        collection: str,
+        generation: int,
+        params_list: Sequence[Dict[str, Any]],
+        results_list: Sequence[List[Dict[str, Any]]]
+    ):
+        """寫入檢索結果（以查詢前讀到的版本號，避免期間匯入的文件被舊結果遮蔽）"""
+        backend = await self._get_backend()
+        if backend is None or not params_list:
+            return
+        items = {
+            self._results_key(collection, generation, params): json.dumps(results, ensure_ascii=False, default=str).encode("utf-8")
+            for params, results in zip(params_list, results_list)
+        }
+        try:
+            await backend.mset(items, ttl=settings.retrieval_cache_ttl)
+        except Exception as e:
+            self._on_error("寫入", e)
+
+
+# 全域實例
+query_cache = QueryCache()
@@ -0,0 +1,136 @@
+"""文字分塊 - 中文標點感知、以 token 計長、跨頁連續"""
+import re
+from bisect import bisect_right
+from typing import List, Dict, Any, Iterable, Tuple
+
+# 預先編譯的正規表示式（模組載入時編譯一次，所有分塊共用）
+# 句子：以中文句末標點（。！？；）、後接空白的英文句末標點或段落空行結尾；
+# 單一換行（PDF 版面換行）與 "3.5" 之類的小數點不會切斷句子
+_SENTENCE_RE = re.compile(
+    r"(?:[^。！？；.!?;\n]+|[.!?;]+(?!\s|$)|\n(?!\n))+"
+    r"(?:[。！？；]+[」』”’）)]*|[.!?;]+|\n{2,}|$)?"
+    r"|[。！？；.!?;\n]+"
+)
+# Token 估算：連續英數字算一個 token，其餘非空白字元（含每個 CJK 字元與標點）各算一個
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+
+
+def count_tokens(text: str) -> int:
+    """估算文字的 token 數"""
+    return len(_TOKEN_RE.findall(text))
+
+
+class TextChunker:
+    """
+    可重複使用的分塊器
+
+    以句子為單位累積到 chunk_size 個 token，相鄰區塊保留約 chunk_overlap 個 token 的重疊。
+    多頁文字會連續分塊，跨頁的句子不會被切斷，每個區塊記錄起訖頁碼。
+    """
+
+    def __init__(self, chunk_size: int = 200, chunk_overlap: int = 40):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap 必須小於 chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    @staticmethod
+    def _content_start(piece: str, start: int) -> int:
+        """片段第一個非空白字元的位置（句子可能以銜接前一頁的換行開頭，不能用它換算頁碼）"""
+        return start + len(piece) - len(piece.lstrip())
+
+    def _units(self, text: str) -> Iterable[Tuple[str, int, int]]:
+        """將文字切成 (句子, 內容起始位置, token 數)，過長的句子再依 token 邊界切開"""
+        for match in _SENTENCE_RE.finditer(text):
+            sentence = match.group()
+            if not sentence.strip():
+                continue
+
+            n_tokens = len(_TOKEN_RE.findall(sentence))
+            if n_tokens <= self.chunk_size:
+                yield sentence, self._content_start(sentence, match.start()), n_tokens
+                continue
+
+            # 單句超過區塊上限：每 chunk_size 個 token 切一段
+            spans = [m.span() for m in _TOKEN_RE.finditer(sentence)]
+            start = 0
+            for i in range(self.chunk_size, len(spans) + self.chunk_size, self.chunk_size):
+                end = spans[i][0] if i < len(spans) else len(sentence)
+                piece = sentence[start:end]
+                yield piece, self._content_start(piece, match.start() + start), min(i, len(spans)) - (i - self.chunk_size)
+                start = end
+
+    def split_pages(self, pages: List[str], start_page: int = 1) -> List[Dict[str, Any]]:
+        """
+        將多頁文字連續分塊
+
+        各頁以換行銜接後再切句，跨頁的句子會保持完整。
+
+        Args:
+            pages: 每頁的文字
+            start_page: 第一頁的頁碼
+
+        Returns:
+            [{"text": ..., "page_start": ..., "page_end": ...}, ...]
+        """
+        # 記錄每頁在合併文字中的起始位置，用於換算頁碼
+        offsets: List[int] = []
+        page_numbers: List[int] = []
+        parts: List[str] = []
+        position = 0
+        for page_num, page_text in enumerate(pages, start_page):
+            if not page_text:
+                continue
+            offsets.append(position)
+            page_numbers.append(page_num)
+            parts.append(page_text)
+            position += len(page_text) + 1
+        text = "\n".join(parts)
+
+        def page_at(pos: int) -> int:
+            return page_numbers[bisect_right(offsets, pos) - 1]
+
+        chunks = []
+        buffer: List[Tuple[str, int, int]] = []
+        buffer_tokens = 0
+        has_new = False  # buffer 中是否有尚未輸出過的句子（排除純重疊內容）
+
+        def emit():
+            chunk_text = "".join(unit[0] for unit in buffer).strip()
+            if chunk_text:
+                # 起訖頁碼都以實際內容（非空白字元）所在位置計算
+                last_text, last_start, _ = buffer[-1]
+                chunks.append({
+                    "text": chunk_text,
+                    "page_start": page_at(buffer[0][1]),
+                    "page_end": page_at(last_start + len(last_text.strip()) - 1),
+                })
+
+        for unit in self._units(text):
+            if buffer_tokens + unit[2] > self.chunk_size and has_new:
+                emit()
+                # 保留尾端句子作為下一個區塊的重疊
+                overlap: List[Tuple[str, int, int]] = []
+                overlap_tokens = 0
+                for prev in reversed(buffer):
+                    if overlap_tokens + prev[2] > self.chunk_overlap:
+                        break
+                    overlap.insert(0, prev)
+                    overlap_tokens += prev[2]
+                buffer, buffer_tokens, has_new = overlap, overlap_tokens, False
+
+                # 重疊加上新句子仍超過上限時，捨棄重疊
+                while buffer and buffer_tokens + unit[2] > self.chunk_size:
+                    buffer_tokens -= buffer.pop(0)[2]
+
+            buffer.append(unit)
+            buffer_tokens += unit[2]
+            has_new = True
+
+        if has_new:
+            emit()
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        """將單段文字分塊，只回傳文字"""
+        return [chunk["text"] for chunk in self.split_pages([text])]
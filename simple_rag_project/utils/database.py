@@ -1,6 +1,7 @@
 """資料庫連線管理"""
 import asyncio
 from contextlib import asynccontextmanager
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
 from config import settings
@@ -28,11 +29,26 @@ async def get_session():
     finally:
         await session.close()
 
+def _add_missing_columns(conn):
+    """為既有資料表補上新增的可為空欄位（create_all 不會修改已存在的資料表）"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"已新增欄位 {table.name}.{column.name}")
+
+
 async def init_db():
     """初始化資料庫"""
     # 建立所有資料表
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
         print("資料表建立完成")
 
 
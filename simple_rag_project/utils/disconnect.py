@@ -0,0 +1,44 @@
+"""用戶端斷線偵測 - 連線中斷時取消進行中的工作"""
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+from config import settings
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    """用戶端在回應完成前中斷連線"""
+
+
+async def run_until_disconnected(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    執行工作並定期檢查用戶端連線，斷線時取消工作
+
+    Args:
+        request: 目前的請求
+        awaitable: 要執行的協程
+
+    Returns:
+        工作的結果
+
+    Raises:
+        ClientDisconnected: 用戶端已斷線，工作已取消
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.disconnect_poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                # 等待工作處理取消（釋放 LLM 名額、關閉資料庫 Session）
+                await asyncio.gather(task, return_exceptions=True)
+                raise ClientDisconnected()
+    except asyncio.CancelledError:
+        # 伺服器端取消請求時一併取消工作
+        task.cancel()
+        raise
@@ -1,4 +1,5 @@
 """LLM 服務封裝"""
+import asyncio
 from typing import AsyncIterator
 
 from langchain_ollama import ChatOllama
@@ -6,6 +7,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from config import settings
+from utils.metrics import metrics
 
 
 # RAG Prompt 模板
@@ -37,6 +39,8 @@ class LLMService:
         self.llm_type = llm_type or settings.llm_type
         self.model_name = model_name
         self.llm = self._create_llm()
+        # 生成名額：限制同時送往 LLM 的請求數，取消時立即釋放
+        self._slots = asyncio.Semaphore(settings.llm_max_concurrency)
     
     def _create_llm(self):
         """建立 LLM 實例"""
@@ -53,23 +57,39 @@ class LLMService:
     
     async def agenerate(self, prompt: str) -> str:
         """非同步生成回答"""
-        if self.llm_type == "mock":
-            from utils.mock_llm import mock_llm_service
-            return await mock_llm_service.agenerate(prompt)
-        
-        response = await self.llm.ainvoke(prompt)
-        return response.content
+        async with self._slots:
+            metrics.gauge_add("llm_inflight", 1)
+            try:
+                if self.llm_type == "mock":
+                    from utils.mock_llm import mock_llm_service
+                    return await mock_llm_service.agenerate(prompt)
+                
+                response = await self.llm.ainvoke(prompt)
+                return response.content
+            except asyncio.CancelledError:
+                metrics.incr("llm_cancelled_total")
+                raise
+            finally:
+                metrics.gauge_add("llm_inflight", -1)
     
     async def astream(self, prompt: str) -> AsyncIterator[str]:
         """串流生成回答"""
-        if self.llm_type == "mock":
-            from utils.mock_llm import mock_llm_service
-            async for chunk in mock_llm_service.astream(prompt):
-                yield chunk
-        else:
-            async for chunk in self.llm.astream(prompt):
-                if chunk.content:
-                    yield chunk.content
+        async with self._slots:
+            metrics.gauge_add("llm_inflight", 1)
+            try:
+                if self.llm_type == "mock":
+                    from utils.mock_llm import mock_llm_service
+                    async for chunk in mock_llm_service.astream(prompt):
+                        yield chunk
+                else:
+                    async for chunk in self.llm.astream(prompt):
+                        if chunk.content:
+                            yield chunk.content
+            except (asyncio.CancelledError, GeneratorExit):
+                metrics.incr("llm_cancelled_total")
+                raise
+            finally:
+                metrics.gauge_add("llm_inflight", -1)
     
     async def rag_query_async(self, question: str, context: str) -> str:
         """RAG 問答（非同步）"""
@@ -0,0 +1,36 @@
+"""程序內指標 - 計數器與即時數值"""
+import threading
+from typing import Dict
+
+
+class Metrics:
+    """簡單的程序內指標收集（每個 worker 各自獨立）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def incr(self, name: str, value: float = 1):
+        """累加計數器"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge_add(self, name: str, delta: float):
+        """調整即時數值（例如進行中的請求數）"""
+        with self._lock:
+            self._gauges[name] = self._gauges.get(name, 0) + delta
+
+    def set_gauge(self, name: str, value: float):
+        """設定即時數值"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """取得目前所有指標"""
+        with self._lock:
+            return {"counters": dict(self._counters), "gauges": dict(self._gauges)}
+
+
+# 全域實例
+metrics = Metrics()
@@ -0,0 +1,53 @@
+"""最大邊際相關性（MMR）- 在相關性與多樣性之間挑選檢索結果"""
+from typing import List, Sequence
+
+import numpy as np
+
+
+def mmr_select(
+    relevance: Sequence[float],
+    vectors: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    以 MMR 從候選中挑選 k 筆
+
+    每一步選擇 lambda * 與查詢的相似度 - (1 - lambda) * 與已選結果的最大相似度 最高的候選。
+    候選間的相似度矩陣一次以矩陣乘法算出，之後每步只做向量運算。
+
+    Args:
+        relevance: 每個候選與查詢的相似度（Qdrant 的 cosine 分數）
+        vectors: 候選向量
+        k: 要挑選的數量
+        lambda_mult: 1 為只看相關性，0 為只看多樣性
+
+    Returns:
+        依挑選順序排列的候選索引
+    """
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+    k = min(k, n)
+
+    scores = np.asarray(relevance, dtype=np.float32)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1, norms)
+    similarity = matrix @ matrix.T
+
+    first = int(np.argmax(scores))
+    selected = [first]
+    max_similarity = similarity[first].copy()
+    available = np.ones(n, dtype=bool)
+    available[first] = False
+
+    for _ in range(k - 1):
+        mmr = lambda_mult * scores - (1 - lambda_mult) * max_similarity
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+    return selected
@@ -1,13 +1,18 @@
 """
 Mock LLM 服務 - 用於測試，不需要真實的 LLM
 """
+import asyncio  # 模擬生成延遲
 from typing import AsyncIterator  # 型別提示
 
+from config import settings  # 應用設定
+
 
 class MockLLMService:
     """模擬 LLM 服務"""
     
-    def __init__(self):
+    def __init__(self, token_latency: float = None):
+        # 每個 token（字元）的模擬生成延遲，供效能基準模擬真實 LLM 的耗時
+        self.token_latency = settings.mock_llm_token_latency if token_latency is None else token_latency
         self.responses = {
             "你好": "你好！我是一個 AI 助手。很高興認識你！",
             "你是誰": "我是一個簡單的 RAG 系統中的 AI 助手。我可以幫助你回答問題。",
@@ -17,8 +22,19 @@ class MockLLMService:
             "介紹": "我是一個基於 RAG（檢索增強生成）技術的 AI 助手。我可以根據提供的文檔回答問題，也可以進行一般的對話。",
         }
     
+    async def _simulate_latency(self, text: str):
+        """依回答長度模擬生成耗時"""
+        if self.token_latency > 0:
+            await asyncio.sleep(self.token_latency * len(text))
+    
     async def agenerate(self, prompt: str) -> str:
         """非同步生成回答"""
+        response = self._match_response(prompt)
+        await self._simulate_latency(response)
+        return response
+    
+    def _match_response(self, prompt: str) -> str:
+        """根據提示選擇回答"""
         # 簡單的關鍵詞匹配
         prompt_lower = prompt.lower()
         
@@ -34,9 +50,11 @@ class MockLLMService:
     
     async def astream(self, prompt: str) -> AsyncIterator[str]:
         """串流生成回答"""
-        response = await self.agenerate(prompt)
+        response = self._match_response(prompt)
         # 逐字符流式返回
         for char in response:
+            if self.token_latency > 0:
+                await asyncio.sleep(self.token_latency)
             yield char
     
     async def rag_query_async(self, question: str, context: str) -> str:
@@ -44,7 +62,9 @@ class MockLLMService:
         # 如果有上下文，使用上下文
         if context and "沒有找到相關資料" not in context:
             # 從上下文中提取信息並生成回答
-            return f"根據提供的文檔資料，我可以回答你的問題：\n\n{question}\n\n相關資訊：\n{context[:300]}...\n\n基於以上資料，這份文檔提供了相關的信息來回答你的問題。"
+            response = f"根據提供的文檔資料，我可以回答你的問題：\n\n{question}\n\n相關資訊：\n{context[:300]}...\n\n基於以上資料，這份文檔提供了相關的信息來回答你的問題。"
+            await self._simulate_latency(response)
+            return response
         else:
             # 沒有相關資料時，使用通用回答
             return await self.agenerate(question)
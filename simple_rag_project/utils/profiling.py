@@ -0,0 +1,209 @@
+"""請求效能剖析 - 以 cProfile 剖析單一請求（含執行緒中的工作），保存為 .prof 檔"""
+import asyncio
+import cProfile
+import contextvars
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from config import settings
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+_PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ProfileSession:
+    """一次請求的剖析資料：事件迴圈執行緒的 profile 加上各執行緒工作的 profile"""
+
+    def __init__(self, path: str):
+        self.id = uuid4().hex
+        self.path = path
+        self.main = cProfile.Profile()
+        self.threads: List[cProfile.Profile] = []
+        self.started_at = time.perf_counter()
+
+    def stats(self) -> pstats.Stats:
+        """合併所有 profile"""
+        stats = pstats.Stats(self.main)
+        for profile in self.threads:
+            stats.add(profile)
+        return stats
+
+
+_current: contextvars.ContextVar[Optional[ProfileSession]] = contextvars.ContextVar("profile_session", default=None)
+
+
+# Python 3.12 起 cProfile 改用 sys.monitoring：同一時間整個直譯器只能有一個作用中的 profile，
+# 且它會記錄所有執行緒；3.11 以前則只記錄啟用它的執行緒，執行緒池的工作需另外剖析
+_PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+async def to_thread(func: Callable, *args, **kwargs) -> Any:
+    """
+    與 asyncio.to_thread 相同，但目前請求正在剖析時一併剖析執行緒中的工作
+
+    Python 3.11 以前在執行緒中另建 profile，結束時併入請求的剖析結果；
+    3.12 起請求的 profile 已涵蓋所有執行緒，直接執行。
+    """
+    session = _current.get()
+    if session is None or not _PER_THREAD_PROFILES:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    def run():
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 已有其他剖析工具作用中，不剖析也要完成工作
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            session.threads.append(profile)
+
+    return await asyncio.to_thread(run)
+
+
+class Profiler:
+    """剖析檔管理與開關（每個 worker 各自獨立）"""
+
+    def __init__(self):
+        self.enabled = settings.profiling_enabled
+        self.profile_dir = settings.profile_dir
+        # cProfile 在同一執行緒（3.12 起為整個直譯器）同時只能有一個作用中的 profile，一次只剖析一個請求
+        self._busy = threading.Lock()
+
+    def start(self, path: str) -> Optional[ProfileSession]:
+        """開始剖析；其他請求正在剖析時回傳 None"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        session = ProfileSession(path)
+        try:
+            session.main.enable()
+        except ValueError as e:
+            # 其他剖析工具（例如除錯器或覆蓋率工具）作用中
+            self._busy.release()
+            logger.warning(f"無法開始剖析: {e}")
+            return None
+        return session
+
+    def finish(self, session: ProfileSession, status: Optional[int]):
+        """停止剖析並保存剖析檔"""
+        session.main.disable()
+        self._busy.release()
+        elapsed = time.perf_counter() - session.started_at
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            session.stats().dump_stats(self.file_path(session.id))
+            self._write_meta(session, status, elapsed)
+            self._prune()
+            metrics.incr("profiles_captured_total")
+            logger.info(f"已保存剖析檔 {session.id}（{session.path}，{elapsed * 1000:.0f} ms）")
+        except Exception as e:
+            logger.error(f"保存剖析檔失敗: {e}")
+
+    def file_path(self, profile_id: str) -> Optional[str]:
+        """剖析檔路徑（ID 格式不符時為 None，避免路徑穿越）"""
+        if not _PROFILE_ID_RE.match(profile_id):
+            return None
+        return os.path.join(self.profile_dir, f"{profile_id}.prof")
+
+    def _write_meta(self, session: ProfileSession, status: Optional[int], elapsed: float):
+        with open(os.path.join(self.profile_dir, f"{session.id}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"{session.path}\t{status}\t{elapsed * 1000:.1f}\t{len(session.threads)}\n")
+
+    def _prune(self):
+        files = sorted(
+            (os.path.join(self.profile_dir, name) for name in os.listdir(self.profile_dir) if name.endswith(".prof")),
+            key=os.path.getmtime
+        )
+        for path in files[:max(0, len(files) - settings.profile_max_files)]:
+            for target in (path, path[:-len(".prof")] + ".txt"):
+                if os.path.exists(target):
+                    os.remove(target)
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """列出已保存的剖析檔（新到舊）"""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        profiles = []
+        for name in os.listdir(self.profile_dir):
+            if not name.endswith(".prof"):
+                continue
+            profile_id = name[:-len(".prof")]
+            path = os.path.join(self.profile_dir, name)
+            item = {
+                "id": profile_id,
+                "created_at": datetime.fromtimestamp(os.path.getmtime(path)).isoformat(),
+                "size": os.path.getsize(path),
+            }
+            meta_path = os.path.join(self.profile_dir, f"{profile_id}.txt")
+            if os.path.exists(meta_path):
+                with open(meta_path, encoding="utf-8") as f:
+                    request_path, status, elapsed_ms, threads = f.read().strip().split("\t")
+                item.update(path=request_path, status=status, elapsed_ms=float(elapsed_ms), threads=int(threads))
+            profiles.append(item)
+        return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI 中介層：剖析帶有 X-Profile: 1 標頭的請求
+
+    只在 profiler.enabled 時生效，回應加上 X-Profile-Id，剖析檔可由 /profiling/profiles/{id} 下載。
+    未啟用或路徑不符時只做一次字串比對，幾乎沒有額外負擔。
+    注意 cProfile 會記錄事件迴圈執行緒上的所有協程，同時處理的其他請求也會出現在剖析結果中。
+    """
+
+    def __init__(self, app, paths: tuple = ("/chat/query", "/knowledge/upload")):
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not profiler.enabled
+            or scope["path"] not in self.paths
+            or (PROFILE_HEADER, b"1") not in scope["headers"]
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        session = profiler.start(scope["path"])
+        status = None
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                value = session.id.encode() if session else b"busy"
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", value)]
+            await send(message)
+
+        if session is None:
+            metrics.incr("profiles_skipped_total")
+            await self.app(scope, receive, send_with_profile_id)
+            return
+
+        # 請求內建立的工作與執行緒會複製此 context，藉此找到同一個 session
+        token = _current.set(session)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _current.reset(token)
+            profiler.finish(session, status)
+
+
+# 全域實例
+profiler = Profiler()
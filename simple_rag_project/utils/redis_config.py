@@ -2,9 +2,12 @@
 from redis.asyncio import StrictRedis
 from config import settings
 
+# 快取存放二進位向量，回傳值保持 bytes 不做解碼
 redis_client = StrictRedis(
     host=settings.redis_host,
     port=settings.redis_port,
-    db=0,
-    decode_responses=True
+    db=settings.redis_db,
+    decode_responses=False,
+    socket_connect_timeout=1,
+    socket_timeout=1
 )
@@ -0,0 +1,67 @@
+"""擷取文字儲存 - 保存每份文件逐頁擷取的文字，重新分塊或向量化時不必再解析 PDF"""
+import os
+import struct
+import zlib
+from typing import Iterator, List
+
+# 檔案格式：MAGIC + 頁數(uint32)，接著每頁為 壓縮長度(uint32) + zlib 壓縮的 UTF-8 文字
+# 每頁獨立壓縮，讀取時可逐頁串流，不需一次載入整份文件
+_MAGIC = b"RAGPAGES1"
+_COUNT = struct.Struct("<I")
+
+
+class TextStore:
+    """以壓縮檔案保存文件的逐頁文字"""
+
+    def __init__(self, base_dir: str, compress_level: int = 6):
+        self.base_dir = base_dir
+        self.compress_level = compress_level
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def path_for(self, doc_id: int) -> str:
+        """文件對應的儲存路徑"""
+        return os.path.join(self.base_dir, f"{doc_id}.pages")
+
+    def save(self, doc_id: int, pages: List[str]) -> str:
+        """
+        儲存文件的逐頁文字
+
+        Args:
+            doc_id: 文件 ID
+            pages: 每頁的文字
+
+        Returns:
+            儲存路徑
+        """
+        path = self.path_for(doc_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(_COUNT.pack(len(pages)))
+            for page in pages:
+                data = zlib.compress(page.encode("utf-8"), self.compress_level)
+                f.write(_COUNT.pack(len(data)))
+                f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def iter_pages(path: str) -> Iterator[str]:
+        """逐頁讀取文字"""
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"不是有效的文字儲存檔: {path}")
+            (count,) = _COUNT.unpack(f.read(_COUNT.size))
+            for _ in range(count):
+                (size,) = _COUNT.unpack(f.read(_COUNT.size))
+                yield zlib.decompress(f.read(size)).decode("utf-8")
+
+    def load(self, path: str) -> List[str]:
+        """讀取全部頁面"""
+        return list(self.iter_pages(path))
+
+    @staticmethod
+    def delete(path: str):
+        """刪除儲存檔"""
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -1,41 +1,200 @@
 """向量資料庫操作"""
-from typing import List, Dict, Any  # 型別提示
+import re  # 解析 Collection 版本號
+import threading  # 索引設定重新載入鎖
+from typing import List, Dict, Any, Optional, Iterator  # 型別提示
 from uuid import uuid4  # 生成唯一 ID
 
 from qdrant_client import QdrantClient  # Qdrant 向量資料庫客戶端
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue  # Qdrant 資料結構
+from qdrant_client.models import (  # Qdrant 資料結構
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, QueryRequest,
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+)
 from sentence_transformers import SentenceTransformer  # 文本嵌入模型
 
 from config import settings  # 應用設定
 
 
+class IndexConfigError(RuntimeError):
+    """索引與目前的嵌入模型不一致"""
+
+
 class VectorStore:
     """Qdrant 向量資料庫封裝"""
     
     def __init__(self):
+        if settings.qdrant_host == ":memory:":
+            # 明確指定使用 In-Memory Qdrant（測試與效能基準用）
+            self.client = QdrantClient(":memory:")
+            print("✅ 使用 In-Memory Qdrant")
+        else:
+            self.client = self._connect()
+        
+        # 索引建立時使用的嵌入模型與分塊參數記錄在 Collection metadata，優先於環境設定
+        self._refresh_lock = threading.Lock()
+        self.index_config = self.get_index_config(settings.collection_name) or {}
+        model = self.index_config.get("embedding_model") or settings.embedding_model
+        if model != settings.embedding_model:
+            print(f"⚠️  {settings.collection_name} 以 {model} 建立索引，忽略 EMBEDDING_MODEL={settings.embedding_model}")
+        
+        self.use_embedder(model, load_embedder(model))
+        self.check_index_config(self.index_config)
+    
+    @staticmethod
+    def _connect() -> QdrantClient:
+        """連接遠程 Qdrant，失敗時退回 In-Memory 模式"""
         try:
             # 嘗試連接到遠程 Qdrant
-            self.client = QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
+            client = QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
             # 測試連接
-            self.client.get_collections()
+            client.get_collections()
             print(f"✅ 已連接到 Qdrant: {settings.qdrant_host}:{settings.qdrant_port}")
+            return client
         except Exception as e:
             # 如果連接失敗，使用 In-Memory Qdrant
             print(f"⚠️  無法連接到遠程 Qdrant ({e})，使用 In-Memory 模式")
-            self.client = QdrantClient(":memory:")
-        
-        self.embedder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-        self.vector_size = 384  # all-MiniLM-L6-v2 的向量維度
+            return QdrantClient(":memory:")
     
-    def ensure_collection(self, collection_name: str):
-        """確保 Collection 存在"""
+    def use_embedder(self, model_name: str, embedder: SentenceTransformer):
+        """切換查詢與寫入使用的嵌入模型"""
+        self.embedding_model = model_name
+        self.embedder = embedder
+        self.vector_size = embedder.get_sentence_embedding_dimension()
+    
+    def collection_exists(self, name: str) -> bool:
+        """Collection 或別名是否存在"""
         collections = [c.name for c in self.client.get_collections().collections]
-        if collection_name not in collections:
+        return name in collections or self.get_alias_target(name) is not None
+    
+    def ensure_collection(self, collection_name: str, vector_size: int = None, metadata: Dict[str, Any] = None):
+        """
+        確保 Collection 存在（名稱為別名時視為已存在）
+        
+        Args:
+            collection_name: Collection 名稱
+            vector_size: 向量維度（預設為目前嵌入模型的維度）
+            metadata: 建立時一併記錄的索引設定（嵌入模型、分塊參數）
+        """
+        if not self.collection_exists(collection_name):
             self.client.create_collection(
                 collection_name=collection_name,
-                vectors_config=VectorParams(size=self.vector_size, distance=Distance.COSINE)
+                vectors_config=VectorParams(size=vector_size or self.vector_size, distance=Distance.COSINE),
+                metadata=metadata
             )
     
+    def ensure_alias(self, alias: str, vector_size: int = None, metadata: Dict[str, Any] = None):
+        """
+        確保查詢與寫入使用的名稱存在；不存在時建立版本化 Collection（例如 public_v1）並以別名指向它
+
+        之後每次重建索引都只需一次 update_collection_aliases 切換別名。
+        已存在的別名或舊版的實體 Collection 不做任何變更。
+        """
+        if self.collection_exists(alias):
+            return
+        collection_name = self.next_version_name(alias)
+        self.ensure_collection(collection_name, vector_size, metadata)
+        self.client.update_collection_aliases(change_aliases_operations=[
+            CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias))
+        ])
+        print(f"✅ 已建立 {collection_name}，別名 {alias}")
+    
+    def is_physical_collection(self, name: str) -> bool:
+        """名稱是否為實體 Collection（舊版未使用別名的部署）"""
+        return name in [c.name for c in self.client.get_collections().collections]
+    
+    def get_index_config(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        讀取 Collection（或別名指向的 Collection）的索引設定
+        
+        Returns:
+            {"collection", "vector_size", 以及建立時記錄的 metadata}；Collection 不存在時為 None
+        """
+        target = self.get_alias_target(name) or name
+        if not self.client.collection_exists(target):
+            return None
+        config = self.client.get_collection(target).config
+        return {
+            "collection": target,
+            "vector_size": config.params.vectors.size,
+            **(config.metadata or {})
+        }
+    
+    def check_index_config(self, config: Dict[str, Any]):
+        """確認目前的嵌入模型可以查詢該索引"""
+        if config and config["vector_size"] != self.vector_size:
+            raise IndexConfigError(
+                f"Collection {config['collection']} 的向量維度為 {config['vector_size']}，"
+                f"嵌入模型 {self.embedding_model} 的維度為 {self.vector_size}"
+            )
+    
+    def refresh_index_config(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        別名指向的 Collection 改變時（例如其他 worker 完成重建索引）載入新的索引設定與嵌入模型
+        
+        Returns:
+            新的索引設定；沒有改變時為 None
+        """
+        with self._refresh_lock:
+            config = self.get_index_config(name)
+            if not config or config["collection"] == self.index_config.get("collection"):
+                return None
+            
+            model = config.get("embedding_model") or self.embedding_model
+            if model != self.embedding_model:
+                self.use_embedder(model, load_embedder(model))
+            self.check_index_config(config)
+            self.index_config = config
+            return config
+    
+    def get_alias_target(self, alias: str) -> Optional[str]:
+        """取得別名指向的 Collection，不是別名時回傳 None"""
+        for description in self.client.get_aliases().aliases:
+            if description.alias_name == alias:
+                return description.collection_name
+        return None
+    
+    def next_version_name(self, alias: str) -> str:
+        """產生下一個版本化 Collection 名稱，例如 public_v3"""
+        pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+        versions = [
+            int(m.group(1))
+            for c in self.client.get_collections().collections
+            if (m := pattern.match(c.name))
+        ]
+        return f"{alias}_v{max(versions, default=0) + 1}"
+    
+    def swap_alias(self, alias: str, collection_name: str, replace_collection: bool = False) -> Optional[str]:
+        """
+        將別名原子性地切換到新的 Collection
+        
+        Args:
+            alias: 別名（查詢與寫入使用的名稱）
+            collection_name: 新的實體 Collection
+            replace_collection: alias 為舊版的實體 Collection 時刪除它再建立別名
+                （別名不能與 Collection 同名；轉換期間查詢會短暫查無資料，且舊資料無法復原）
+        
+        Returns:
+            切換前別名指向的 Collection（沒有或已在轉換時刪除則為 None）
+        """
+        old_target = self.get_alias_target(alias)
+        operations = []
+        if old_target is not None:
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+        elif self.is_physical_collection(alias):
+            if not replace_collection:
+                raise ValueError(f"{alias} 為實體 Collection，改為別名必須先刪除它")
+            print(f"⚠️  {alias} 為實體 Collection，刪除後改為別名")
+            self.client.delete_collection(alias)
+        
+        operations.append(CreateAliasOperation(
+            create_alias=CreateAlias(collection_name=collection_name, alias_name=alias)
+        ))
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        return old_target
+    
+    def delete_collection(self, collection_name: str):
+        """刪除 Collection"""
+        self.client.delete_collection(collection_name)
+    
     def embed(self, text: str) -> List[float]:
         """文字轉向量"""
         return self.embedder.encode(text).tolist()
@@ -48,7 +207,9 @@ class VectorStore:
         self,
         collection_name: str,
         documents: List[str],
-        metadata_list: List[Dict[str, Any]] = None
+        metadata_list: List[Dict[str, Any]] = None,
+        ids: List[str] = None,
+        vectors: List[List[float]] = None
     ) -> int:
         """
         新增文件到向量資料庫
@@ -57,26 +218,32 @@ class VectorStore:
             collection_name: Collection 名稱
             documents: 文件內容列表
             metadata_list: 每個文件的 metadata
+            ids: 每個文件的 Point ID（固定 ID 可讓重複寫入覆蓋而非重複新增）
+            vectors: 預先計算的向量（預設使用目前的嵌入模型）
         
         Returns:
             新增的文件數量
         """
-        self.ensure_collection(collection_name)
+        if vectors is None:
+            # 向量化
+            vectors = self.embed_batch(documents)
+        
+        self.ensure_collection(collection_name, len(vectors[0]) if len(vectors) else None)
         
         if metadata_list is None:
             metadata_list = [{}] * len(documents) #依照docment的長度來去設定metadata_list會有幾個空字典
         
-        # 向量化
-        vectors = self.embed_batch(documents)
+        if ids is None:
+            ids = [str(uuid4()) for _ in documents]
         
         # 建立 Points
         points = [
             PointStruct(
-                id=str(uuid4()),
+                id=point_id,
                 vector=vector,
                 payload={"text": doc, **meta}
             )
-            for doc, vector, meta in zip(documents, vectors, metadata_list)
+            for point_id, doc, vector, meta in zip(ids, documents, vectors, metadata_list)
         ]
         
         # 存入 Qdrant
@@ -88,7 +255,9 @@ class VectorStore:
         collection_name: str,
         query: str,
         top_k: int = 5,
-        filter_conditions: Dict[str, Any] = None
+        filter_conditions: Dict[str, Any] = None,
+        with_vectors: bool = False,
+        query_vector: List[float] = None
     ) -> List[Dict[str, Any]]:
         """
         搜尋相關文件
@@ -98,38 +267,115 @@ class VectorStore:
             query: 查詢文字
             top_k: 返回前幾筆結果
             filter_conditions: 過濾條件 {"field": "value"}
+            with_vectors: 是否一併回傳向量（結果中的 "vector"）
+            query_vector: 預先計算的查詢向量（例如來自快取），省略時以 query 向量化
         
         Returns:
             相關文件列表
         """
-        query_vector = self.embed(query)
-        
-        # 建立過濾條件
-        search_filter = None
-        if filter_conditions:
-            must_conditions = [
-                FieldCondition(key=k, match=MatchValue(value=v))
-                for k, v in filter_conditions.items()
-            ]
-            search_filter = Filter(must=must_conditions)
+        if query_vector is None:
+            query_vector = self.embed(query)
         
         # 使用 query_points (qdrant-client >= 1.10)
         results = self.client.query_points(
             collection_name=collection_name,
             query=query_vector,
             limit=top_k,
-            query_filter=search_filter,
-            with_payload=True
+            query_filter=self._build_filter(filter_conditions),
+            with_payload=True,
+            with_vectors=with_vectors
         )
         
-        return [
-            {
+        return self._to_results(results.points, with_vectors)
+    
+    def search_batch(
+        self,
+        collection_name: str,
+        queries: List[str],
+        top_k: int = 5,
+        filter_conditions: Dict[str, Any] = None,
+        with_vectors: bool = False,
+        query_vectors: List[List[float]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批次搜尋：一次向量化所有查詢，並以單次 Qdrant 請求完成搜尋
+        
+        Args:
+            collection_name: Collection 名稱
+            queries: 查詢文字列表
+            top_k: 每個查詢返回前幾筆結果
+            filter_conditions: 過濾條件 {"field": "value"}，套用於所有查詢
+            with_vectors: 是否一併回傳向量
+            query_vectors: 預先計算的查詢向量，省略時一次向量化所有查詢
+        
+        Returns:
+            與 queries 順序相同的結果列表
+        """
+        if not queries:
+            return []
+        
+        if query_vectors is None:
+            query_vectors = self.embed_batch(queries)
+        search_filter = self._build_filter(filter_conditions)
+        
+        responses = self.client.query_batch_points(
+            collection_name=collection_name,
+            requests=[
+                QueryRequest(
+                    query=vector, filter=search_filter, limit=top_k,
+                    with_payload=True, with_vector=with_vectors
+                )
+                for vector in query_vectors
+            ]
+        )
+        
+        return [self._to_results(response.points, with_vectors) for response in responses]
+    
+    @staticmethod
+    def _build_filter(filter_conditions: Dict[str, Any] = None) -> Filter:
+        """建立過濾條件"""
+        if not filter_conditions:
+            return None
+        return Filter(must=[
+            FieldCondition(key=k, match=MatchValue(value=v))
+            for k, v in filter_conditions.items()
+        ])
+    
+    @staticmethod
+    def _to_results(points, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        """將 Qdrant 結果轉為字典列表"""
+        results = []
+        for hit in points:
+            result = {
                 "text": hit.payload.get("text", ""),
                 "score": hit.score,
                 "metadata": {k: v for k, v in hit.payload.items() if k != "text"}
             }
-            for hit in results.points
-        ]
+            if with_vectors:
+                result["vector"] = hit.vector
+            results.append(result)
+        return results
+    
+    def scroll_payloads(
+        self,
+        collection_name: str,
+        filter_conditions: Dict[str, Any] = None,
+        batch_size: int = 256
+    ) -> Iterator[Dict[str, Any]]:
+        """逐批讀取符合條件的所有 Point payload"""
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=self._build_filter(filter_conditions),
+                limit=batch_size,
+                offset=offset,
+                with_payload=True
+            )
+            for record in records:
+                yield record.payload
+            if offset is None:
+                break
     
     def delete_by_filename(self, collection_name: str, filename: str):
         """根據檔名刪除文件"""
@@ -141,5 +387,10 @@ class VectorStore:
         )
 
 
+def load_embedder(model_name: str) -> SentenceTransformer:
+    """載入嵌入模型"""
+    return SentenceTransformer(model_name)
+
+
 # 全域實例
 vector_store = VectorStore()